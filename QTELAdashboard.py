@@ -1,10 +1,13 @@
 import os
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from textwrap import dedent
 
+import survey_perf
+
+# Per-section timings of this run (sidebar performance panel / metrics file).
+# Started before the heavy imports so the cold start includes them.
+timer = survey_perf.SectionTimer()
+
 # ===============================
 # Page config + basic CSS (dark gradient + cards)
 # ===============================
@@ -50,6 +53,8 @@ st.markdown(
     .stTabs [data-baseweb="tab-list"] { justify-content:center; }
     .stTabs [data-baseweb="tab"] { border-radius:10px; background: rgba(255,255,255,0.04); padding:8px 16px; margin:0 6px; }
     .stTabs [aria-selected="true"] { background: linear-gradient(90deg,#ff77c0,#00ffff); color:black; font-weight:700; }
+    /* Lazy tab selector (radio) styled like the tabs */
+    div[role="radiogroup"] { justify-content:center; }
     /* Minor text */
     .small { font-size:13px; color:#d0d0d0; }
     </style>
@@ -61,23 +66,107 @@ st.markdown(
 st.markdown("<h1 style='text-align:center;'>🏢 Dashboard Analisis Fasilitas Twin Tower</h1>", unsafe_allow_html=True)
 st.markdown("<hr style='border:1px solid #ff77c0;'>", unsafe_allow_html=True)
 
+# ===============================
+# Heavy imports (after the page shell has been sent)
+# ===============================
+# pandas/numpy load here; plotly.express is imported by survey_charts only when
+# the first figure is built, i.e. after the summary metrics are on screen.
+with timer.section("imports"):
+    import pandas as pd
+
+    import survey_charts
+    import survey_data
+    import survey_stats
+
+
+# Candidate factor list (same as awal)
+candidate_factors = survey_stats.CANDIDATE_FACTORS
+# Aggregates (means, correlations, OLS) cover every numeric column incl. *_log and *_z
+CUBE_COLUMNS = survey_data.ANALYSIS_COLUMNS
+# Drill-down filters (multi-select) in the "Filter lanjutan" expander
+DRILL_FILTERS = {
+    "Pilihan_Twin_Tower": "Pilihan Twin Tower:",
+    "Kesediaan_Isi_Survei": "Kesediaan isi survei:",
+    "Sarana_Prasarana_Stres": "Sarana prasarana meredakan stres:",
+    "Jam_Minggu_Akademik": "Jam akademik per minggu:",
+}
+# Rows kept for row-level charts (scatter, histogram, download) when streaming an upload
+STREAM_SAMPLE_ROWS = 20_000
+
+
+@st.cache_resource(max_entries=2, show_spinner="Memproses file per bagian...")
+def load_streamed(version, _buffer, columns):
+    """Stream an upload chunk by chunk: aggregates over every row plus a bounded row sample."""
+    def rewind():
+        _buffer.seek(0)
+        return _buffer
+
+    reservoir = survey_data.Reservoir(STREAM_SAMPLE_ROWS)
+
+    def chunks():
+        for chunk in survey_data.iter_csv_chunks(rewind):
+            reservoir.add(chunk)
+            yield survey_data.numeric_frame(chunk)
+
+    streamed_cube = survey_stats.AggregateCube.from_chunks(chunks(), columns)
+    return reservoir.result()._replace(version=version), streamed_cube
+
+
+@st.cache_resource(max_entries=4, show_spinner="Menyiapkan file unduhan...")
+def export_file(version, filter_key, columns, fmt, _data, _rows):
+    """Download bytes for (dataset version, filter, columns, format), built once and shared."""
+    return survey_data.export_bytes(survey_data.export_frame(_data, list(columns), _rows), fmt)
+
+
+@st.cache_resource(max_entries=32, show_spinner="Menghitung interval kepercayaan (bootstrap)...")
+def confidence_intervals(version, filter_key, columns, _rows):
+    """Bootstrap CIs for (dataset version + drill-down, filter), computed once and shared."""
+    return survey_stats.bootstrap_intervals(_rows, list(columns))
+
+
 # ===============================
 # Load data (local preferred)
 # ===============================
-DATA_FILENAME = "processed_survey_data.csv"
+# Parsing + column normalization is cached process-wide in survey_data and
+# only redone when the file (mtime/size) or the uploaded bytes change.
+# The dashboard works on the raw block (int8 answers, categorical labels).
+# An up-to-date Parquet/Feather copy (python survey_data.py) is preferred over the CSV.
+DATA_FILENAME = survey_data.DATA_FILENAME
 df = None
-if os.path.exists(DATA_FILENAME):
+streamed_cube = None
+local_path = survey_data.local_source(DATA_FILENAME)
+if local_path is not None:
     try:
-        df = pd.read_csv(DATA_FILENAME)
-        st.sidebar.success(f"✅ Memuat file lokal: {DATA_FILENAME}")
+        with timer.section("load") as rec:
+            data = survey_data.load_file(local_path)
+            rec["rows"] = len(data.raw)
+        df = data.raw
+        st.sidebar.success(f"✅ Memuat file lokal: {local_path}")
     except Exception as e:
-        st.sidebar.error(f"Gagal membaca {DATA_FILENAME}: {e}")
+        st.sidebar.error(f"Gagal membaca {local_path}: {e}")
 
 if df is None:
     uploaded_file = st.file_uploader("📂 Upload file hasil survei (CSV) — atau letakkan processed_survey_data.csv di folder script", type=["csv"])
     if uploaded_file is not None:
+        streaming = st.sidebar.checkbox(
+            "Proses unggahan per bagian (streaming)",
+            value=uploaded_file.size > survey_data.STREAMING_UPLOAD_BYTES,
+            help="Untuk file besar: header dicek dulu, lalu agregat dihitung per bagian tanpa memuat seluruh file.",
+        )
         try:
-            df = pd.read_csv(uploaded_file)
+            with timer.section("load") as rec:
+                if streaming:
+                    # Hash the upload once per file_id, not on every rerun
+                    fingerprints = st.session_state.setdefault("upload_fingerprints", {})
+                    if uploaded_file.file_id not in fingerprints:
+                        fingerprints.clear()
+                        fingerprints[uploaded_file.file_id] = survey_data.buffer_fingerprint(uploaded_file)
+                    version = fingerprints[uploaded_file.file_id]
+                    data, streamed_cube = load_streamed(version, uploaded_file, tuple(CUBE_COLUMNS))
+                else:
+                    data = survey_data.load_uploaded(uploaded_file.getvalue())
+                rec["rows"] = len(data.raw)
+            df = data.raw
             st.sidebar.success("✅ File CSV berhasil diunggah.")
         except Exception as e:
             st.error(f"Gagal membaca file yang diunggah: {e}")
@@ -86,28 +175,53 @@ if df is None:
         st.info("Silakan unggah file CSV atau letakkan file 'processed_survey_data.csv' di folder yang sama dengan script ini.")
         st.stop()
 
-# ===============================
-# Column normalization (preserve original logic)
-# ===============================
-col_renames = {}
-if "Program_Studi" in df.columns and "Prodi" not in df.columns:
-    col_renames["Program_Studi"] = "Prodi"
-if "Program Studi" in df.columns and "Prodi" not in df.columns:
-    col_renames["Program Studi"] = "Prodi"
-if "ProgramStudy" in df.columns and "Prodi" not in df.columns:
-    col_renames["ProgramStudy"] = "Prodi"
-if "Kepuasan" in df.columns and "Kepuasan_Keseluruhan" not in df.columns:
-    col_renames["Kepuasan"] = "Kepuasan_Keseluruhan"
-if col_renames:
-    df = df.rename(columns=col_renames)
+_cache_stats = survey_data.cache_stats()
+_fig_stats = survey_charts.FIGURE_CACHE.stats()
+st.sidebar.caption(
+    f"Cache data: {_cache_stats['hits']} hit / {_cache_stats['misses']} miss · "
+    f"Cache grafik: {_fig_stats['hits']} hit / {_fig_stats['misses']} miss ({_fig_stats['bytes'] / 1e6:.1f} MB)"
+)
 
 # Ensure required columns exist
-required_min = ["Fakultas", "Kepuasan_Keseluruhan"]
-missing = [c for c in required_min if c not in df.columns]
+missing = survey_data.missing_required(df)
 if missing:
     st.error(f"Kolom wajib tidak ditemukan di file CSV: {missing}. Pastikan file mengandung kolom tersebut.")
     st.stop()
 
+# Aggregates for every Fakultas/Prodi filter state, built once per dataset version
+if streamed_cube is not None:
+    # Built from every streamed row; df only holds the sample
+    survey_stats.put_cube(data.version, CUBE_COLUMNS, streamed_cube)
+    st.sidebar.info(f"Mode streaming: {streamed_cube.get().n} baris diringkas; grafik per responden memakai sampel {len(df)} baris.")
+# precompute.py may have stored the local file's cube as a snapshot
+snapshot = survey_stats.snapshot_path(DATA_FILENAME) if data.version[0] == "file" else None
+with timer.section("cube", rows=len(df)):
+    cube = survey_stats.get_cube(data.version, lambda: survey_data.numeric_frame(data), CUBE_COLUMNS, snapshot)
+
+# Append a new survey wave to the local file (data + aggregates updated incrementally)
+if data.version[0] == "file" and os.path.exists(DATA_FILENAME):
+    with st.sidebar.expander("➕ Tambah batch respons baru"):
+        if "append_message" in st.session_state:
+            st.success(st.session_state.pop("append_message"))
+        append_round = st.session_state.get("append_round", 0)
+        batch_file = st.file_uploader("CSV batch (format sama dengan data)", type=["csv"], key=f"append_batch_{append_round}")
+        if batch_file is not None and st.button("Tambahkan ke data", key="append_submit"):
+            try:
+                batch = survey_data.load_uploaded(batch_file.getvalue())
+                updated = survey_data.append_csv(batch, DATA_FILENAME)
+            except Exception as e:
+                st.error(f"Batch ditolak: {e}")
+            else:
+                added = len(batch.raw)
+                # Extend this session's cube only if no other append landed in between;
+                # otherwise the next run builds the cube of the new version from scratch
+                if len(updated.raw) == len(data.raw) + added:
+                    new_rows = survey_data.SurveyData(updated.raw.tail(added), updated.standardized.tail(added))
+                    survey_stats.put_cube(updated.version, CUBE_COLUMNS, cube.appended(survey_data.numeric_frame(new_rows)))
+                st.session_state["append_round"] = append_round + 1
+                st.session_state["append_message"] = f"✅ {len(batch.raw)} respons ditambahkan."
+                st.rerun()
+
 # Sidebar filters
 st.sidebar.header("Filter Global")
 fakultas_opts = ["Semua"] + sorted(df["Fakultas"].dropna().unique().tolist()) if "Fakultas" in df.columns else ["Semua"]
@@ -115,45 +229,117 @@ fakultas = st.sidebar.selectbox("Pilih Fakultas:", fakultas_opts)
 prodi_opts = ["Semua"] + sorted(df["Prodi"].dropna().unique().tolist()) if "Prodi" in df.columns else ["Semua"]
 prodi = st.sidebar.selectbox("Pilih Program Studi:", prodi_opts)
 
-# Apply filters
-df_filtered = df.copy()
-if fakultas != "Semua" and "Fakultas" in df_filtered.columns:
-    df_filtered = df_filtered[df_filtered["Fakultas"] == fakultas]
-if prodi != "Semua" and "Prodi" in df_filtered.columns:
-    df_filtered = df_filtered[df_filtered["Prodi"] == prodi]
-
-if df_filtered.empty:
+# Drill-down filters over other dimensions, resolved through a per-value bitmap index
+index = survey_stats.get_index(data.version, df)
+drill = {}
+with st.sidebar.expander("🔎 Filter lanjutan"):
+    for col, label in DRILL_FILTERS.items():
+        if index.values(col):
+            chosen = st.multiselect(label, index.values(col), key=f"drill_{col}", placeholder="Semua")
+            if chosen:
+                drill[col] = chosen
+    range_cols = [c for c in candidate_factors + ["Kepuasan_Keseluruhan"] if len(index.values(c)) > 1]
+    for col in st.multiselect("Batasi rentang skor:", range_cols, key="drill_ranges", placeholder="Tidak ada"):
+        values = index.values(col)
+        low, high = st.slider(col, values[0], values[-1], (values[0], values[-1]), key=f"drill_range_{col}")
+        if (low, high) != (values[0], values[-1]):
+            drill[col] = [v for v in values if low <= v <= high]
+
+# Apply filters (bitwise AND of the selected bitmaps; no mask over the full frame)
+with timer.section("filter", rows=len(df)):
+    selection = dict(drill)
+    if fakultas != survey_stats.ALL:
+        selection["Fakultas"] = [fakultas]
+    if prodi != survey_stats.ALL:
+        selection["Prodi"] = [prodi]
+    rows = index.rows(selection)
+
+filter_key = (fakultas, prodi)
+if len(rows) == 0:
     st.warning("Tidak ada data setelah filter. Menampilkan seluruh data asli.")
-    df_filtered = df.copy()
-
-# Candidate factor list (same as awal)
-candidate_factors = [
-    "Kualitas_Internet", "Ketersediaan_Fasilitas", "Jam_Operasional", "Peningkatan_Motivasi",
-    "Lingkungan_Lebih_Baik", "Fasilitas_Difabel", "Diskusi_Kelompok", "Peningkatan_Citra"
-]
+    drill = {}
+    rows = index.rows({})
+    filter_key = (survey_stats.ALL, survey_stats.ALL)
+df_filtered = df if len(rows) == len(df) else df.iloc[rows]
+
+# Drill-down filters narrow the rows behind every aggregate: they get their own cube,
+# cached per selection in a separate LRU so they never evict the dataset cubes
+view_version = data.version
+if drill:
+    view_version = data.version + (survey_stats.freeze_selection(drill),)
+    drill_rows = index.rows(drill)
+    st.sidebar.caption(f"Filter lanjutan aktif: {len(drill_rows)} dari {len(df)} responden.")
+    with timer.section("cube", rows=len(drill_rows)):
+        cube = survey_stats.get_drill_cube(data.version, drill, lambda: survey_data.numeric_frame(
+            survey_data.SurveyData(df.iloc[drill_rows], data.standardized.iloc[drill_rows])), CUBE_COLUMNS)
+
+# All statistics for the active filter, computed once and shared by every chart
+with timer.section("aggregates", rows=len(df_filtered)):
+    stats = cube.stats(*filter_key)
 available_factors = [c for c in candidate_factors if c in df_filtered.columns]
 
-# Tabs
-tab1, tab2, tab3 = st.tabs(["📋 Summary", "🔧 Analisis Faktor", "📊 Distribusi & Korelasi"])
+# Uncertainty of the means (bootstrap over the filtered rows; a streamed upload only keeps a sample)
+show_ci = streamed_cube is None and st.sidebar.checkbox(
+    "Tampilkan interval kepercayaan 95%", value=True, key="show_ci",
+    help="Interval bootstrap untuk rata-rata; lebar pada kelompok dengan sedikit responden.",
+)
+_ci = {}
+
+
+def confidence():
+    """Bootstrap CIs of the active filter (None when switched off).
+
+    Computed on first use, by the first chart that shows intervals, so a
+    new filter state never holds back the metrics or the charts without them.
+    """
+    if show_ci and "value" not in _ci:
+        with timer.section("bootstrap", rows=len(df_filtered)):
+            _ci["value"] = confidence_intervals(view_version, filter_key, tuple(available_factors + ["Kepuasan_Keseluruhan"]), df_filtered)
+    return _ci.get("value")
+
+
+def ci_caption(placeholder, column):
+    """Fill a placeholder under a metric with 'IK 95%: low – high'."""
+    ci = confidence()
+    if ci is None or column not in ci.overall.index:
+        return
+    low, high = ci.overall.loc[column, ["low", "high"]]
+    placeholder.caption(f"IK {ci.level:.0%}: {low:.2f} – {high:.2f}")
+
+
+# ===============================
+# Figure cache (shared by all sessions, keyed by dataset version + filter)
+# ===============================
+def cached_figure(chart_id, build):
+    """Figure for (dataset version + drill-down, filter, chart), built once per server process."""
+    key = (view_version, filter_key, chart_id, show_ci)
+    fig = survey_charts.FIGURE_CACHE.get_or_build(key, build)
+    timer.add_bytes(survey_charts.FIGURE_CACHE.nbytes(key))
+    return fig
+
 
 # ---------------------------
 # TAB 1: Summary
 # ---------------------------
-with tab1:
+def render_summary():
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.header("Summary")
     col1, col2, col3 = st.columns(3)
-    total_responden = len(df_filtered)
-    avg_kepuasan = round(df_filtered["Kepuasan_Keseluruhan"].mean(), 2)
-    avg_internet = round(df_filtered["Kualitas_Internet"].mean(), 2) if "Kualitas_Internet" in df_filtered.columns else "N/A"
-    avg_kep = df_filtered["Kepuasan_Keseluruhan"].mean()
-
-    with col1:
-        st.metric("👥 Total Responden", total_responden, help="Jumlah mahasiswa yang disurvei")
-    with col2:
-        st.metric("⭐ Rata-rata Kepuasan", avg_kepuasan, help="Rata-rata kepuasan dari 1 (tidak puas) hingga 5 (sangat puas)")
-    with col3:
-        st.metric("🌐 Rata-rata Internet", avg_internet, help="Rata-rata kualitas internet")
+    total_responden = stats.n
+    avg_kep = stats.means["Kepuasan_Keseluruhan"]
+    avg_kepuasan = round(avg_kep, 2)
+    avg_internet = round(stats.means["Kualitas_Internet"], 2) if "Kualitas_Internet" in available_factors else "N/A"
+
+    with timer.section("summary_metrics", rows=stats.n):
+        with col1:
+            st.metric("👥 Total Responden", total_responden, help="Jumlah mahasiswa yang disurvei")
+        with col2:
+            st.metric("⭐ Rata-rata Kepuasan", avg_kepuasan, help="Rata-rata kepuasan dari 1 (tidak puas) hingga 5 (sangat puas)")
+            ci_kepuasan = st.empty()
+        with col3:
+            st.metric("🌐 Rata-rata Internet", avg_internet, help="Rata-rata kualitas internet")
+            ci_internet = st.empty()
+    timer.mark("first_paint")
     st.markdown("</div>", unsafe_allow_html=True)
 
     # explanatory text + gauge
@@ -169,96 +355,33 @@ with tab1:
             """),
             unsafe_allow_html=True
         )
-        fig_gauge = go.Figure(go.Indicator(
-            mode="gauge+number",
-            value=avg_kepuasan,
-            number={'font': {'size': 44}},
-            gauge={
-                'axis': {'range': [0, 5]},
-                'bar': {'color': "#00FFFF"},
-                'steps': [
-                    {'range': [0, 2.5], 'color': "#ff4d4d"},
-                    {'range': [2.5, 3.5], 'color': "#ffb84d"},
-                    {'range': [3.5, 5], 'color': "#00ff99"}
-                ],
-                'threshold': {'line': {'color': "white", 'width': 4}, 'value': avg_kepuasan}
-            }
-        ))
-        fig_gauge.update_layout(height=260, paper_bgcolor="rgba(0,0,0,0)", font_color="white", margin=dict(t=20,b=10))
-        st.plotly_chart(fig_gauge, use_container_width=True)
+        with timer.section("gauge", rows=stats.n):
+            fig_gauge = cached_figure("gauge", lambda: survey_charts.gauge(avg_kepuasan))
+            st.plotly_chart(fig_gauge, use_container_width=True)
     with col_right:
         st.markdown("### Grafik Peningkatan Motivasi")
-        if "Peningkatan_Motivasi" in df_filtered.columns:
-            motiv_counts = df_filtered["Peningkatan_Motivasi"].value_counts().sort_index()
-            df_motiv = pd.DataFrame({
-                "Skor": motiv_counts.index.astype(str),
-                "Jumlah": motiv_counts.values
-            })
-
-            fig_motiv = px.bar(
-                df_motiv,
-                x="Skor",
-                y="Jumlah",
-                text="Jumlah",
-                labels={"Skor": "Skor Motivasi", "Jumlah": "Jumlah Responden"},
-                title="",
-                color_discrete_sequence=["#ff77c0"]
-            )
-
-            fig_motiv.update_traces(
-                textposition="outside",
-                marker_line_color="white",
-                marker_line_width=0.5
-            )
-
-            fig_motiv.update_layout(
-                plot_bgcolor="rgba(0,0,0,0)",   # area plot transparan
-                paper_bgcolor="rgba(0,0,0,0)",  # latar belakang luar juga transparan
-                font_color="white",              # teks putih
-                margin=dict(t=10, b=10, l=10, r=10),
-                xaxis=dict(showgrid=False),
-                yaxis=dict(showgrid=False)
-            )
-
-            st.plotly_chart(fig_motiv, use_container_width=True)
-
-        else:
-            if available_factors:
-                means = (
-                    df_filtered[available_factors]
-                    .mean()
-                    .sort_values(ascending=False)
-                    .reset_index()
-                )
-                means.columns = ["Faktor", "Rata-rata"]
-
-                fig_motiv = px.bar(
-                    means.head(5),
-                    x="Faktor",
-                    y="Rata-rata",
-                    text="Rata-rata",
-                    title="",
-                    color_discrete_sequence=["#ff77c0"]
-                )
-
-                fig_motiv.update_traces(
-                    textposition="outside",
-                    marker_line_color="white",
-                    marker_line_width=0.5
-                )
-
-                fig_motiv.update_layout(
-                    plot_bgcolor="rgba(0,0,0,0)",
-                    paper_bgcolor="rgba(0,0,0,0)",
-                    font_color="white",
-                    margin=dict(t=10, b=10, l=10, r=10),
-                    xaxis=dict(showgrid=False),
-                    yaxis=dict(showgrid=False)
-                )
-
+        with timer.section("motivasi", rows=stats.n):
+            if "Peningkatan_Motivasi" in stats.value_counts:
+                motiv_counts = stats.value_counts["Peningkatan_Motivasi"]
+                df_motiv = pd.DataFrame({
+                    "Skor": motiv_counts.index.astype(str),
+                    "Jumlah": motiv_counts.values
+                })
+                fig_motiv = cached_figure("motivasi", lambda: survey_charts.motivation_bar(df_motiv))
                 st.plotly_chart(fig_motiv, use_container_width=True)
+
             else:
-                st.info("Tidak ada data motivasi atau faktor untuk ditampilkan.")
+                if available_factors:
+                    means = (
+                        stats.means[available_factors]
+                        .sort_values(ascending=False)
+                        .reset_index()
+                    )
+                    means.columns = ["Faktor", "Rata-rata"]
+                    fig_motiv = cached_figure("motivasi", lambda: survey_charts.top_means_bar(means.head(5)))
+                    st.plotly_chart(fig_motiv, use_container_width=True)
+                else:
+                    st.info("Tidak ada data motivasi atau faktor untuk ditampilkan.")
 
     st.markdown("</div>", unsafe_allow_html=True)
     st.markdown("<hr style='border:1px solid rgba(255,119,192,0.25)'>", unsafe_allow_html=True)
@@ -268,71 +391,29 @@ with tab1:
     st.header("Perbandingan Faktor dengan Skor Kepuasan Tertinggi dan Terendah")
 
     if available_factors:
-        factor_means = (
-            df_filtered[available_factors]
-            .mean()
-            .sort_values(ascending=False)
-            .reset_index()
-        )
-        factor_means.columns = ["Faktor", "Rata_rata_Skor"]
-
-        # Bulatkan skor rata-rata biar tampil rapi
-        factor_means["Rata_rata_Skor"] = factor_means["Rata_rata_Skor"].round(2)
-
-        top_factors = factor_means.head(5)
-        bottom_factors = factor_means.tail(5)
-
-        col1, col2 = st.columns(2)
-
-        # Grafik Faktor Terbaik
-        with col1:
-            st.subheader("Faktor dengan Skor Tertinggi")
-            fig_top = px.bar(
-                top_factors,
-                y="Faktor",
-                x="Rata_rata_Skor",
-                orientation="h",
-                color_discrete_sequence=["#ff77c0"]
-            )
-            fig_top.update_traces(
-                text=None,  # hilangkan teks di batang
-                marker_line_color="white",
-                marker_line_width=0.5
-            )
-            fig_top.update_layout(
-                plot_bgcolor="rgba(0,0,0,0)",
-                paper_bgcolor="rgba(0,0,0,0)",
-                font_color="white",
-                margin=dict(t=10, b=10, l=10, r=10),
-                xaxis=dict(showgrid=False, title="Rata-rata Skor"),
-                yaxis=dict(showgrid=False, title="Faktor")
-            )
-            st.plotly_chart(fig_top, use_container_width=True)
-
-        # Grafik Faktor Terendah
-        with col2:
-            st.subheader("Faktor dengan Skor Terendah")
-            fig_bottom = px.bar(
-                bottom_factors,
-                y="Faktor",
-                x="Rata_rata_Skor",
-                orientation="h",
-                color_discrete_sequence=["#ff77c0"]
-            )
-            fig_bottom.update_traces(
-                text=None,  # hilangkan angka di batang
-                marker_line_color="white",
-                marker_line_width=0.5
-            )
-            fig_bottom.update_layout(
-                plot_bgcolor="rgba(0,0,0,0)",
-                paper_bgcolor="rgba(0,0,0,0)",
-                font_color="white",
-                margin=dict(t=10, b=10, l=10, r=10),
-                xaxis=dict(showgrid=False, title="Rata-rata Skor"),
-                yaxis=dict(showgrid=False, title="Faktor")
-            )
-            st.plotly_chart(fig_bottom, use_container_width=True)
+        with timer.section("top_bottom_factors", rows=stats.n):
+            # Skor rata-rata dibulatkan biar tampil rapi
+            factor_means = survey_stats.factor_ranking(stats.means[available_factors])
+            ci = confidence()
+            if ci is not None:
+                factor_means = factor_means.join(ci.overall[["low", "high"]], on="Faktor")
+
+            top_factors = factor_means.head(5)
+            bottom_factors = factor_means.tail(5)
+
+            col1, col2 = st.columns(2)
+
+            # Grafik Faktor Terbaik
+            with col1:
+                st.subheader("Faktor dengan Skor Tertinggi")
+                fig_top = cached_figure("faktor_top", lambda: survey_charts.factor_bar(top_factors))
+                st.plotly_chart(fig_top, use_container_width=True)
+
+            # Grafik Faktor Terendah
+            with col2:
+                st.subheader("Faktor dengan Skor Terendah")
+                fig_bottom = cached_figure("faktor_bottom", lambda: survey_charts.factor_bar(bottom_factors))
+                st.plotly_chart(fig_bottom, use_container_width=True)
 
         st.markdown(
             "<p style='color:#ffb6d9; font-size:14px;'>"
@@ -356,63 +437,42 @@ with tab1:
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.subheader("📚 Rata-rata Kepuasan per Fakultas")
 
-    if "Fakultas" in df_filtered.columns and "Kepuasan_Keseluruhan" in df_filtered.columns:
-        avg_per_fak = (
-            df_filtered.groupby("Fakultas")["Kepuasan_Keseluruhan"]
-            .mean()
-            .reset_index()
-            .sort_values(by="Kepuasan_Keseluruhan", ascending=False)
-        )
-
-        fig_fak = px.bar(
-            avg_per_fak,
-            x="Fakultas",
-            y="Kepuasan_Keseluruhan",
-            text=avg_per_fak["Kepuasan_Keseluruhan"].round(2),
-            title="",
-            color_discrete_sequence=["#FF69B4"],
-        )
-
-        fig_fak.update_traces(
-            textposition="outside",
-            textfont=dict(color="white", size=14),
-            marker=dict(line=dict(color="white", width=1.5)),
-        )
-
-        fig_fak.update_layout(
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            font_color="white",
-            xaxis=dict(title="", tickangle=0, color="white", showgrid=False, showline=False),
-            yaxis=dict(title="Rata-rata Kepuasan", color="white", showgrid=False, showline=False),
-            margin=dict(t=10, b=40, l=40, r=40),
-            hoverlabel=dict(bgcolor="#222", font_color="white"),
-            bargap=0.3,
-        )
-
-        fig_fak.update_traces(hovertemplate="<b>%{x}</b><br>Skor: %{y:.2f}<extra></extra>")
-        st.plotly_chart(fig_fak, use_container_width=True)
+    if "Fakultas" in df.columns and "Kepuasan_Keseluruhan" in df.columns:
+        with timer.section("fakultas_bar", rows=stats.n):
+            avg_per_fak = (
+                stats.fakultas_means[["Fakultas", "Kepuasan_Keseluruhan"]]
+                .sort_values(by="Kepuasan_Keseluruhan", ascending=False)
+            )
+            ci = confidence()
+            if ci is not None:
+                avg_per_fak = avg_per_fak.merge(ci.by_fakultas[["Fakultas", "low", "high"]], on="Fakultas", how="left")
+            fig_fak = cached_figure("fakultas_bar", lambda: survey_charts.fakultas_bar(avg_per_fak))
+            st.plotly_chart(fig_fak, use_container_width=True)
     else:
         st.info("Kolom 'Fakultas' atau 'Kepuasan_Keseluruhan' tidak tersedia.")
 
     st.markdown("</div>", unsafe_allow_html=True)
 
+    # Intervals under the metrics fill in last, after every chart that does not need them
+    ci_caption(ci_kepuasan, "Kepuasan_Keseluruhan")
+    ci_caption(ci_internet, "Kualitas_Internet")
+
 
 # ---------------------------
 # TAB 2: Analisis Faktor
 # ---------------------------
-with tab2:
+def render_factor_analysis():
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.header("Analisis Faktor (Proporsi & Dampak Faktor)")
     st.markdown(" ")
     # Pie chart proporsi responden per fakultas (preserved)
     st.subheader("Proporsi Responden per Fakultas")
-    if "Fakultas" in df_filtered.columns:
-        pie_data = df_filtered["Fakultas"].value_counts().reset_index()
-        pie_data.columns = ["Fakultas", "Jumlah"]
-        fig_pie = px.pie(pie_data, values="Jumlah", names="Fakultas", title="", color_discrete_sequence=px.colors.qualitative.Pastel)
-        fig_pie.update_layout(paper_bgcolor="rgba(0,0,0,0)", font_color="white", margin=dict(t=10,b=10))
-        st.plotly_chart(fig_pie, use_container_width=True)
+    if "Fakultas" in df.columns:
+        with timer.section("pie", rows=stats.n):
+            pie_data = stats.fakultas_counts.reset_index()
+            pie_data.columns = ["Fakultas", "Jumlah"]
+            fig_pie = cached_figure("pie", lambda: survey_charts.fakultas_pie(pie_data))
+            st.plotly_chart(fig_pie, use_container_width=True)
         st.markdown("**Penjelasan**: Menunjukkan distribusi responden antar fakultas.")
     else:
         st.info("Kolom 'Fakultas' tidak ada.")
@@ -421,13 +481,12 @@ with tab2:
     # Stacked contribution (preserved)
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.subheader("Kontribusi Faktor per Fakultas (Rata-rata skor)")
-    selected_for_stacked = [c for c in ["Kualitas_Internet","Ketersediaan_Fasilitas","Jam_Operasional","Peningkatan_Motivasi"] if c in available_factors]
+    selected_for_stacked = [c for c in survey_stats.STACKED_FACTORS if c in available_factors]
     if selected_for_stacked:
-        stacked_data = df_filtered.groupby("Fakultas")[selected_for_stacked].mean().reset_index()
-        stacked_melted = stacked_data.melt(id_vars="Fakultas", var_name="Faktor", value_name="Skor")
-        fig_stacked = px.bar(stacked_melted, x="Fakultas", y="Skor", color="Faktor", barmode="stack", color_discrete_sequence=px.colors.qualitative.Set2)
-        fig_stacked.update_layout(paper_bgcolor="rgba(0,0,0,0)", font_color="white", margin=dict(t=10,b=10))
-        st.plotly_chart(fig_stacked, use_container_width=True)
+        with timer.section("stacked", rows=stats.n):
+            stacked_melted = survey_stats.stacked_contribution(stats.fakultas_means, selected_for_stacked)
+            fig_stacked = cached_figure("stacked", lambda: survey_charts.stacked_contribution(stacked_melted))
+            st.plotly_chart(fig_stacked, use_container_width=True)
     else:
         st.info("Kolom faktor utama tidak tersedia untuk analisis stacked.")
     st.markdown("</div>", unsafe_allow_html=True)
@@ -435,14 +494,28 @@ with tab2:
     # Scatter factor vs kepuasan (preserved)
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.subheader("Hubungan Faktor dengan Kepuasan (Scatter + Trendline)")
-    if available_factors and "Kepuasan_Keseluruhan" in df_filtered.columns:
+    if available_factors and "Kepuasan_Keseluruhan" in df.columns:
         factor_choice = st.selectbox("Pilih Faktor untuk scatter:", available_factors, key="scatter_factor")
-        fig_scatter = px.scatter(df_filtered, x=factor_choice, y="Kepuasan_Keseluruhan",
-                                 color="Fakultas" if "Fakultas" in df_filtered.columns else None,
-                                 trendline="ols", color_discrete_sequence=px.colors.qualitative.Set1)
-        fig_scatter.update_layout(paper_bgcolor="rgba(0,0,0,0)", font_color="white", margin=dict(t=10,b=10))
-        st.plotly_chart(fig_scatter, use_container_width=True)
-        st.markdown("**Penjelasan**: Titik = responden; garis = trend (OLS).")
+        if st.checkbox("Pra-hitung trendline semua faktor", key="precompute_trendlines",
+                       help="Menghitung garis OLS untuk semua faktor di latar belakang agar pergantian faktor instan."):
+            cube.precompute_trendlines(available_factors, "Kepuasan_Keseluruhan", *filter_key)
+        with st.expander("Pengaturan scatter (data besar)"):
+            scatter_mode = st.selectbox("Mode tampilan:", list(survey_charts.SCATTER_MODES),
+                                        format_func=survey_charts.SCATTER_MODES.get, key="scatter_mode")
+            max_points = st.number_input("Batas titik untuk mode otomatis:", min_value=100,
+                                         value=survey_charts.LARGE_SCATTER_ROWS, step=1000, key="scatter_max_points")
+        with timer.section("scatter", rows=len(df_filtered)):
+            scatter_mode = survey_charts.resolve_scatter_mode(scatter_mode, len(df_filtered), max_points)
+            fits = cube.trendlines(factor_choice, "Kepuasan_Keseluruhan", *filter_key)
+            fig_scatter = cached_figure(("scatter", factor_choice, scatter_mode),
+                                        lambda: survey_charts.factor_scatter(df_filtered, factor_choice, fits, scatter_mode))
+            st.plotly_chart(fig_scatter, use_container_width=True)
+        if scatter_mode == "bubble":
+            st.markdown("**Penjelasan**: Ukuran gelembung = jumlah responden dengan jawaban yang sama; garis = trend (OLS).")
+        elif scatter_mode == "density":
+            st.markdown("**Penjelasan**: Warna kotak = jumlah responden dengan jawaban yang sama; garis = trend (OLS).")
+        else:
+            st.markdown("**Penjelasan**: Titik = responden; garis = trend (OLS).")
     else:
         st.info("Tidak ada faktor numerik atau kolom 'Kepuasan_Keseluruhan' untuk scatter.")
     st.markdown("</div>", unsafe_allow_html=True)
@@ -451,31 +524,34 @@ with tab2:
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.subheader("Perbandingan Semua Faktor (Radar)")
     if available_factors:
-        radar_data = df_filtered[available_factors].mean().reset_index()
-        radar_data.columns = ["Faktor", "Skor"]
-        fig_radar = go.Figure(data=go.Scatterpolar(r=radar_data["Skor"], theta=radar_data["Faktor"], fill='toself', line_color="#00FFFF"))
-        fig_radar.update_layout(polar={'radialaxis': {'range': [0, 5]}}, paper_bgcolor="rgba(0,0,0,0)", font_color="white", margin=dict(t=10,b=10))
-        st.plotly_chart(fig_radar, use_container_width=True)
+        with timer.section("radar", rows=stats.n):
+            radar_data = stats.means[available_factors].reset_index()
+            radar_data.columns = ["Faktor", "Skor"]
+            ci = confidence()
+            if ci is not None:
+                radar_data = radar_data.join(ci.overall[["low", "high"]], on="Faktor")
+            fig_radar = cached_figure("radar", lambda: survey_charts.radar(radar_data))
+            st.plotly_chart(fig_radar, use_container_width=True)
         st.markdown("**Penjelasan**: Semakin besar area, semakin kuat dampak faktor.")
     else:
         st.info("Tidak ada faktor numerik untuk radar.")
     st.markdown("</div>", unsafe_allow_html=True)
 
+
 # ---------------------------
 # TAB 3: Distribusi & Korelasi
 # ---------------------------
-with tab3:
+def render_distribution():
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.header("Distribusi & Korelasi")
     st.markdown(" ")
     # Histogram (preserved)
     st.subheader("Seberapa Banyak Mahasiswa Puas?")
-    if "Kepuasan_Keseluruhan" in df_filtered.columns:
-        avg_all = df_filtered["Kepuasan_Keseluruhan"].mean()
-        fig_hist = px.histogram(df_filtered, x="Kepuasan_Keseluruhan", nbins=10, title="", color_discrete_sequence=["#ff77c0"])
-        fig_hist.add_vline(x=avg_all, line_dash="dash", line_color="#00FFFF", annotation_text=f"Rata-rata: {avg_all:.2f}", annotation_position="top right")
-        fig_hist.update_layout(paper_bgcolor="rgba(0,0,0,0)", font_color="white", margin=dict(t=10,b=10))
-        st.plotly_chart(fig_hist, use_container_width=True)
+    if "Kepuasan_Keseluruhan" in df.columns:
+        with timer.section("histogram", rows=len(df_filtered)):
+            avg_all = stats.means["Kepuasan_Keseluruhan"]
+            fig_hist = cached_figure("histogram", lambda: survey_charts.satisfaction_histogram(df_filtered, avg_all))
+            st.plotly_chart(fig_hist, use_container_width=True)
         st.markdown("**Penjelasan**: Garis biru menunjukkan rata-rata keseluruhan.")
     else:
         st.info("Kolom 'Kepuasan_Keseluruhan' tidak tersedia.")
@@ -484,23 +560,140 @@ with tab3:
     # Heatmap korelasi (preserved)
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.header("Hubungan Antar Faktor (Heatmap Korelasi dengan Angka)")
-    heat_cols = available_factors + (["Kepuasan_Keseluruhan"] if "Kepuasan_Keseluruhan" in df_filtered.columns else [])
+    default_heat = available_factors + (["Kepuasan_Keseluruhan"] if "Kepuasan_Keseluruhan" in df.columns else [])
+    # Any numeric column (incl. *_log and standardized *_z): the matrix comes from the cube, not the rows
+    heat_options = [c for c in cube.columns if stats.counts[c] > 0]
+    heat_cols = st.multiselect("Kolom untuk heatmap:", heat_options, default=[c for c in default_heat if c in heat_options],
+                               key="heat_cols", help="Kolom berakhiran _z adalah versi terstandardisasi (z-score).")
     if len(heat_cols) > 1:
-        corr = df_filtered[heat_cols].corr()
-        fig_heat = px.imshow(corr, text_auto=True, color_continuous_scale="RdYlGn", aspect="auto")
-        fig_heat.update_layout(paper_bgcolor="rgba(0,0,0,0)", font_color="white", margin=dict(t=10,b=10))
-        st.plotly_chart(fig_heat, use_container_width=True)
+        with timer.section("heatmap", rows=stats.n):
+            corr = stats.corr.loc[heat_cols, heat_cols]
+            fig_heat = cached_figure(("heatmap", tuple(heat_cols)), lambda: survey_charts.correlation_heatmap(corr))
+            st.plotly_chart(fig_heat, use_container_width=True)
         st.markdown("**Penjelasan**: Angka di tiap kotak adalah koefisien korelasi (Pearson).", unsafe_allow_html=True)
     else:
         st.info("Tidak cukup kolom numerik untuk membuat heatmap korelasi.")
     st.markdown("</div>", unsafe_allow_html=True)
 
+
+# ---------------------------
+# TAB 4: Perbandingan Segmen
+# ---------------------------
+def render_comparison():
+    st.markdown("<div class='card'>", unsafe_allow_html=True)
+    st.header("Perbandingan Segmen")
+    st.markdown(" ")
+    dimension = st.radio("Bandingkan:", ["Fakultas", "Prodi"], horizontal=True, key="compare_dimension")
+    # Prodi are compared within the Fakultas chosen in the sidebar
+    scope = filter_key[0] if dimension == "Prodi" else survey_stats.ALL
+    options = cube.segment_names(dimension, scope)
+    if len(options) < 2 or not available_factors:
+        st.info("Tidak cukup segmen untuk dibandingkan dengan filter saat ini.")
+        st.markdown("</div>", unsafe_allow_html=True)
+        return
+    largest = cube.compare(dimension, options, available_factors, scope).n.nlargest(3).index.tolist()
+    names = st.multiselect("Pilih segmen:", options, default=[n for n in options if n in largest],
+                           key=f"compare_{dimension}_{scope}")
+    if not names:
+        st.info("Pilih minimal satu segmen.")
+        st.markdown("</div>", unsafe_allow_html=True)
+        return
+
+    # Every segment comes from the cube's single grouped pass: no per-segment rerun or filter
+    with timer.section("comparison", rows=stats.n):
+        comparison = cube.compare(dimension, names, available_factors, scope)
+        chart_key = (dimension, scope, tuple(names))
+
+        st.subheader("Rata-rata Skor Faktor per Segmen")
+        fig_means = cached_figure(("compare_means",) + chart_key,
+                                  lambda: survey_charts.comparison_means(comparison.means.loc[available_factors]))
+        st.plotly_chart(fig_means, use_container_width=True)
+
+        st.subheader("Distribusi Kepuasan per Segmen")
+        if len(comparison.distribution.columns):
+            fig_dist = cached_figure(("compare_distribution",) + chart_key,
+                                     lambda: survey_charts.comparison_distribution(comparison.distribution))
+            st.plotly_chart(fig_dist, use_container_width=True)
+        else:
+            st.info("Kolom 'Kepuasan_Keseluruhan' tidak tersedia.")
+
+        st.subheader("Faktor Tertinggi & Terendah per Segmen")
+
+        def describe(ranking):
+            return ", ".join(f"{r.Faktor} ({r.Rata_rata_Skor:.2f})" for r in ranking.itertuples())
+
+        table = pd.DataFrame({
+            "Responden": comparison.n,
+            "Rata-rata Kepuasan": comparison.means.loc["Kepuasan_Keseluruhan"].round(2),
+            "Faktor tertinggi": {name: describe(r.head(3)) for name, r in comparison.rankings.items()},
+            "Faktor terendah": {name: describe(r.tail(3)) for name, r in comparison.rankings.items()},
+        })
+        st.dataframe(table, use_container_width=True)
+    st.markdown("**Penjelasan**: Distribusi dalam persen responden tiap segmen, sehingga segmen dengan jumlah responden berbeda tetap sebanding.")
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+# Tabs
+TABS = {
+    "📋 Summary": render_summary,
+    "🔧 Analisis Faktor": render_factor_analysis,
+    "📊 Distribusi & Korelasi": render_distribution,
+    "⚖️ Perbandingan Segmen": render_comparison,
+}
+# Lazy mode renders only the selected tab; st.tabs always runs (and ships) all three
+lazy_tabs = st.sidebar.toggle("⚡ Render hanya tab aktif", value=True, help="Grafik di tab lain baru dibuat saat tab tersebut dibuka.")
+if lazy_tabs:
+    active_tab = st.radio("Tab", list(TABS), horizontal=True, label_visibility="collapsed", key="active_tab")
+    TABS[active_tab]()
+else:
+    for tab, render in zip(st.tabs(list(TABS)), TABS.values()):
+        with tab:
+            render()
+# Other tabs have no metrics: their first paint is the end of the tab
+timer.mark("first_paint")
+
 # ---------------------------
 # Footer: download + sample data
 # ---------------------------
 st.markdown("<hr style='border:1px solid rgba(255,119,192,0.12)'>", unsafe_allow_html=True)
 with st.expander("📥 Download / Lihat Data (sample)"):
-    st.download_button("Unduh CSV (filtered)", df_filtered.to_csv(index=False), "data_kepuasan_filtered.csv")
-    st.dataframe(df_filtered.head(20))
+    with timer.section("download", rows=len(df_filtered)) as rec:
+        # The file is only built when asked for, then cached per filter/columns/format
+        export_options = list(df.columns) + [c + survey_data.STANDARDIZED_SUFFIX for c in data.standardized.columns]
+        export_cols = st.multiselect("Kolom yang diunduh:", export_options, default=list(df.columns), key="export_cols")
+        export_fmt = st.radio("Format:", list(survey_data.EXPORT_FORMATS), horizontal=True, key="export_fmt",
+                              format_func=lambda f: survey_data.EXPORT_FORMATS[f][0])
+        export_key = (view_version, filter_key, tuple(export_cols), export_fmt)
+        if not export_cols:
+            st.info("Pilih minimal satu kolom untuk diunduh.")
+        elif st.session_state.get("export_ready") == export_key:
+            payload = export_file(*export_key, _data=data, _rows=df_filtered.index)
+            rec["bytes"] = len(payload)
+            _, mime, ext = survey_data.EXPORT_FORMATS[export_fmt]
+            st.download_button(f"Unduh {len(df_filtered)} baris ({len(payload) / 1e3:.1f} KB)", payload,
+                               "data_kepuasan_filtered" + ext, mime, on_click="ignore")
+        elif st.button("Siapkan file unduhan", key="export_prepare"):
+            st.session_state["export_ready"] = export_key
+            st.rerun()
+        st.dataframe(df_filtered.head(20))
 
 st.caption("Dashboard dibuat untuk analisis cepat. Jika nama kolom di file CSV berbeda, beri tahu nama kolomnya agar aku sesuaikan kodenya.")
+
+# ===============================
+# Performance panel (opt-in) + metrics export
+# ===============================
+# One JSON line per run goes to $DASHBOARD_METRICS_FILE when it is set
+timer.finish()
+timer.export(source=str(data.version[1]), filter=list(filter_key), drill=drill,
+             tab=st.session_state.get("active_tab") if lazy_tabs else "all")
+if st.sidebar.checkbox("🛠️ Panel performa (debug)", key="perf_panel",
+                       help="Waktu, jumlah baris, dan ukuran payload grafik per bagian pada run ini."):
+    perf = timer.frame()
+    perf["ms"] = (perf.pop("seconds") * 1000).round(1)
+    st.sidebar.caption(f"Total run: {timer.elapsed() * 1000:.0f} ms · payload grafik: {perf['bytes'].sum() / 1e3:.1f} KB")
+    if survey_perf.COLD_START:
+        cold = survey_perf.COLD_START
+        st.sidebar.caption(f"Cold start proses ini: ringkasan tampil {cold.get('first_paint', 0) * 1000:.0f} ms, "
+                           f"run pertama selesai {cold['total'] * 1000:.0f} ms")
+    st.sidebar.dataframe(perf, hide_index=True, use_container_width=True)
+    st.sidebar.download_button("Unduh metrik (CSV)", perf.to_csv(index=False), "dashboard_metrics.csv")
@@ -0,0 +1,257 @@
+"""Benchmark the dashboard's load, filter, aggregation and render paths.
+
+    python benchmark.py [--rows 1000 100000 1000000] [--repeat 3] [--out benchmark_results.json]
+
+Synthetic surveys are generated in the layout of processed_survey_data.csv
+(raw block + mirrored block) by resampling its rows and perturbing every
+answer, so value ranges, Fakultas/Prodi pairs and correlations stay
+realistic. Each stage runs the same code the dashboard runs and is timed
+``--repeat`` times (best time kept); results are written as JSON records
+(rows, stage, seconds, bytes) so runs can be compared for regressions.
+
+Cold start is measured in fresh interpreters: module imports, the first
+plotly figure, and a first headless run of the dashboard on the real CSV
+(seconds until the summary metrics are painted, and for the whole run).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import plotly
+
+import survey_charts
+import survey_data
+import survey_stats
+
+DEFAULT_ROWS = [1_000, 100_000, 1_000_000]
+CUBE_COLUMNS = survey_data.ANALYSIS_COLUMNS
+# Share of answers moved one step up or down from the resampled value
+JITTER_SHARE = 0.3
+
+
+def synthetic_survey(n_rows, template=survey_data.DATA_FILENAME, seed=0):
+    """``n_rows`` responses in the CSV file layout (duplicate column names included)."""
+    rng = np.random.default_rng(seed)
+    raw = survey_data.load_csv(template).raw
+    rows = raw.iloc[rng.integers(0, len(raw), n_rows)].reset_index(drop=True)
+    for col, (low, high) in survey_data.VALUE_RANGES.items():
+        if col in rows.columns:
+            step = rng.integers(-1, 2, n_rows) * (rng.random(n_rows) < JITTER_SHARE)
+            rows[col] = np.clip(rows[col].to_numpy() + step, low, high).astype("int8")
+    for col, log_col in [("Jam_Minggu_Akademik", "Jam_Minggu_log"), ("Durasi_GF_Kelas", "Durasi_GF_log")]:
+        hours = np.maximum(rows[col].to_numpy() + rng.normal(0, 1, n_rows).round(), 0)
+        rows[col] = hours
+        rows[log_col] = np.log1p(hours)
+    mirror = rows.copy()
+    for col in survey_data.STANDARDIZED_COLUMNS:
+        mirror[col] = (rows[col] - rows[col].mean()) / rows[col].std(ddof=0)
+    return pd.concat([rows, mirror], axis=1)
+
+
+def synthetic_csv(n_rows, data_dir, template=survey_data.DATA_FILENAME):
+    """Path of a synthetic CSV with ``n_rows`` rows, generated once per data_dir."""
+    path = os.path.join(data_dir, f"synthetic_survey_{n_rows}.csv")
+    if not os.path.exists(path):
+        synthetic_survey(n_rows, template).to_csv(path, index=False)
+    return path
+
+
+# Run in a fresh interpreter each; print a JSON dict of seconds
+COLD_IMPORT_CODE = """
+import json, time
+start = time.perf_counter()
+import survey_charts, survey_data, survey_stats
+imported = time.perf_counter()
+survey_charts.gauge(3.5).to_json()
+print(json.dumps({"cold_imports": imported - start, "cold_first_figure": time.perf_counter() - imported}))
+"""
+COLD_DASHBOARD_CODE = """
+import json
+from streamlit.testing.v1 import AppTest
+import survey_perf
+AppTest.from_file("QTELAdashboard.py", default_timeout=300).run()
+print(json.dumps({"cold_first_paint": survey_perf.COLD_START.get("first_paint"),
+                  "cold_first_run": survey_perf.COLD_START.get("total")}))
+"""
+
+
+def bench_cold_start(repeat):
+    """Cold-start records (best of ``repeat`` fresh interpreters)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = {**os.environ, "PYTHONPATH": here}
+    best = {}
+    for code in (COLD_IMPORT_CODE, COLD_DASHBOARD_CODE):
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c", code], cwd=here, env=env,
+                                 capture_output=True, text=True, check=True)
+            for stage, seconds in json.loads(out.stdout.strip().splitlines()[-1]).items():
+                if seconds is not None:
+                    best[stage] = min(best.get(stage, float("inf")), seconds)
+    records = []
+    for stage, seconds in best.items():
+        records.append({"rows": None, "stage": stage, "seconds": round(seconds, 6), "bytes": None})
+        print(f"{'-':>10} {stage:<28} {seconds * 1000:>10.2f} ms")
+    return records
+
+
+def timed(fn, repeat, setup=None):
+    """(best wall time in seconds, result of the last call)."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def figure_builders(df_filtered, stats, cube, filter_key):
+    """The dashboard's charts for one filter state, as name -> builder."""
+    factors = [c for c in survey_stats.CANDIDATE_FACTORS if c in stats.means.index]
+    ranking = survey_stats.factor_ranking(stats.means[factors])
+    motiv = stats.value_counts["Peningkatan_Motivasi"]
+    df_motiv = pd.DataFrame({"Skor": motiv.index.astype(str), "Jumlah": motiv.values})
+    pie_data = stats.fakultas_counts.reset_index()
+    pie_data.columns = ["Fakultas", "Jumlah"]
+    radar_data = stats.means[factors].reset_index()
+    radar_data.columns = ["Faktor", "Skor"]
+    avg = stats.means[survey_stats.TARGET]
+    scatter_mode = survey_charts.resolve_scatter_mode("auto", len(df_filtered))
+    fits = cube.trendlines(factors[0], survey_stats.TARGET, *filter_key)
+    heat_cols = factors + [survey_stats.TARGET]
+    return {
+        "gauge": lambda: survey_charts.gauge(round(avg, 2)),
+        "motivasi": lambda: survey_charts.motivation_bar(df_motiv),
+        "faktor_top": lambda: survey_charts.factor_bar(ranking.head(5)),
+        "faktor_bottom": lambda: survey_charts.factor_bar(ranking.tail(5)),
+        "fakultas_bar": lambda: survey_charts.fakultas_bar(
+            stats.fakultas_means[["Fakultas", survey_stats.TARGET]].sort_values(by=survey_stats.TARGET, ascending=False)),
+        "pie": lambda: survey_charts.fakultas_pie(pie_data),
+        "stacked": lambda: survey_charts.stacked_contribution(
+            survey_stats.stacked_contribution(stats.fakultas_means, survey_stats.STACKED_FACTORS)),
+        f"scatter_{scatter_mode}": lambda: survey_charts.factor_scatter(df_filtered, factors[0], fits, scatter_mode),
+        "radar": lambda: survey_charts.radar(radar_data),
+        "histogram": lambda: survey_charts.satisfaction_histogram(df_filtered, avg),
+        "heatmap": lambda: survey_charts.correlation_heatmap(stats.corr.loc[heat_cols, heat_cols]),
+    }
+
+
+def bench_size(n_rows, data_dir, repeat, template=survey_data.DATA_FILENAME):
+    """Benchmark records for one dataset size."""
+    records = []
+
+    def record(stage, seconds, nbytes=None):
+        records.append({"rows": n_rows, "stage": stage, "seconds": round(seconds, 6), "bytes": nbytes})
+        print(f"{n_rows:>10} {stage:<28} {seconds * 1000:>10.2f} ms" + (f" {nbytes:>12} B" if nbytes is not None else ""))
+
+    path = synthetic_csv(n_rows, data_dir, template)
+    record("csv_file", 0.0, os.path.getsize(path))
+
+    # Loading: plain pandas parse, alias/dtype normalization, and the schema-typed loader
+    seconds, untyped = timed(lambda: pd.read_csv(path), repeat)
+    record("csv_read_untyped", seconds)
+    schema = {c: t for c, t in survey_data.SCHEMA.items() if c in untyped.columns}
+    seconds, _ = timed(lambda: survey_data.normalize_columns(untyped).astype(schema), repeat)
+    record("normalize_columns", seconds)
+    seconds, data = timed(lambda: survey_data.load_csv(path), repeat, setup=survey_data.clear_cache)
+    record("csv_load", seconds)
+    df = data.raw
+    del untyped
+
+    # Sidebar filtering (largest Fakultas, then its largest Prodi)
+    fakultas = df["Fakultas"].value_counts().index[0]
+    prodi = df.loc[df["Fakultas"] == fakultas, "Prodi"].value_counts().index[0]
+    filter_key = (fakultas, prodi)
+    seconds, df_filtered = timed(lambda: survey_stats.filter_rows(df, *filter_key), repeat)
+    record("filter", seconds)
+    seconds, index = timed(lambda: survey_stats.BitmapIndex(df), repeat)
+    record("bitmap_index_build", seconds)
+    selection = {"Fakultas": [fakultas], "Prodi": [prodi], "Kualitas_Internet": [3, 4, 5],
+                 "Jam_Minggu_Akademik": survey_stats.BUCKETS["Jam_Minggu_Akademik"][1][1:3]}
+    seconds, _ = timed(lambda: index.rows(selection), repeat)
+    record("filter_bitmap_4_dims", seconds)
+
+    # Aggregations
+    frame = survey_data.numeric_frame(data)
+    seconds, cube = timed(lambda: survey_stats.AggregateCube(frame, CUBE_COLUMNS), repeat)
+    record("cube_build", seconds)
+    seconds, stats = timed(lambda: cube.stats(*filter_key), repeat, setup=cube.clear)
+    record("segment_stats", seconds)
+    factors = [c for c in survey_stats.CANDIDATE_FACTORS if c in df.columns]
+    seconds, _ = timed(lambda: (survey_stats.factor_ranking(stats.means[factors]),
+                                stats.value_counts["Peningkatan_Motivasi"],
+                                stats.fakultas_means.sort_values(by=survey_stats.TARGET, ascending=False)), repeat)
+    record("tab_summary", seconds)
+    seconds, _ = timed(lambda: (stats.fakultas_counts.reset_index(),
+                                survey_stats.stacked_contribution(stats.fakultas_means, survey_stats.STACKED_FACTORS),
+                                stats.means[factors].reset_index()), repeat)
+    record("tab_factor_analysis", seconds)
+    seconds, _ = timed(lambda: stats.corr.loc[CUBE_COLUMNS, CUBE_COLUMNS], repeat)
+    record("tab_distribution", seconds)
+    rows = frame.loc[df_filtered.index, CUBE_COLUMNS]
+    seconds, _ = timed(lambda: rows.corr(), repeat)
+    record("corr_pandas", seconds)
+    seconds, _ = timed(lambda: survey_stats.Aggregates.from_frame(rows, CUBE_COLUMNS, {}).corr(), repeat)
+    record("corr_sufficient_stats", seconds)
+    seconds, _ = timed(lambda: [cube.trendlines(x, survey_stats.TARGET, *filter_key) for x in factors],
+                       repeat, setup=cube.clear)
+    record("ols_trendlines", seconds)
+    seconds, _ = timed(lambda: survey_stats.bootstrap_intervals(df_filtered, factors + [survey_stats.TARGET]), repeat)
+    record("bootstrap_ci", seconds)
+
+    # Figures: build, then JSON serialization (what Streamlit sends to the browser)
+    stats = cube.stats(*filter_key)
+    for name, build in figure_builders(df_filtered, stats, cube, filter_key).items():
+        seconds, fig = timed(build, repeat)
+        record(f"figure:{name}", seconds)
+        seconds, payload = timed(fig.to_json, repeat)
+        record(f"figure_json:{name}", seconds, len(payload))
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard on synthetic data.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--template", default=survey_data.DATA_FILENAME, help="survey CSV to resample")
+    parser.add_argument("--data-dir", help="where synthetic CSVs are kept (default: a temporary directory)")
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--skip-cold-start", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        records = [] if args.skip_cold_start else bench_cold_start(args.repeat)
+        for n_rows in args.rows:
+            records += bench_size(n_rows, data_dir, args.repeat, args.template)
+            survey_data.clear_cache()
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "repeat": args.repeat,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "plotly": plotly.__version__,
+        },
+        "results": records,
+    }
+    with open(args.out, "w", encoding="utf-8") as out:
+        json.dump(report, out, indent=1)
+    print(f"results -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
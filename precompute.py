@@ -0,0 +1,79 @@
+"""Precompute the dashboard analytics for every Fakultas/Prodi filter state.
+
+    python precompute.py [data file] [--workers N] [--json out.json]
+
+Builds the aggregate cube in a process pool (one partition per Fakultas) and
+writes it next to the CSV as a snapshot; the dashboard loads it instead of
+aggregating on its first run. The snapshot carries the data file's version,
+so it is ignored once the data changes (rerun this after appending batches).
+"""
+import argparse
+import json
+import logging
+import math
+import time
+
+import survey_data
+import survey_stats
+
+# Must match the dashboard's CUBE_COLUMNS for the snapshot to be used
+COLUMNS = survey_data.ANALYSIS_COLUMNS
+
+
+def _json_ready(value):
+    """``value`` with NaN/inf (e.g. the correlation of a constant column) as None."""
+    if isinstance(value, dict):
+        return {k: _json_ready(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_json_ready(v) for v in value]
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def segment_summary(stats):
+    """JSON-ready analytics of one filter state (the values the dashboard charts)."""
+    factors = [c for c in survey_stats.CANDIDATE_FACTORS if c in stats.means.index]
+    ranking = survey_stats.factor_ranking(stats.means[factors])
+    stacked = [c for c in survey_stats.STACKED_FACTORS if c in factors]
+    return _json_ready({
+        "n": int(stats.n),
+        "means": stats.means.round(4).to_dict(),
+        "top_factors": ranking.head(5).to_dict("records"),
+        "bottom_factors": ranking.tail(5).to_dict("records"),
+        "fakultas_means": stats.fakultas_means.round(4).to_dict("records"),
+        "stacked": survey_stats.stacked_contribution(stats.fakultas_means, stacked).round(4).to_dict("records"),
+        "corr": stats.corr.round(4).to_dict(),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute dashboard analytics for every filter state.")
+    parser.add_argument("data", nargs="?", default=survey_data.DATA_FILENAME)
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--json", help="also export the per-segment analytics as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    start = time.perf_counter()
+    data = survey_data.load_file(survey_data.local_source(args.data))
+    cube = survey_stats.build_cube_parallel(survey_data.numeric_frame(data), COLUMNS, args.workers)
+    path = survey_stats.snapshot_path(args.data)
+    survey_stats.write_snapshot(path, data.version, COLUMNS, cube)
+    print(f"{len(cube.segments)} filter states from {len(data.raw)} rows in {time.perf_counter() - start:.2f}s -> {path}")
+
+    if args.json:
+        export = {
+            "source": args.data,
+            "segments": [
+                {"fakultas": f, "prodi": p, **segment_summary(cube.stats(f, p))}
+                for f, p in sorted(cube.segments)
+            ],
+        }
+        with open(args.json, "w", encoding="utf-8") as out:
+            json.dump(export, out, ensure_ascii=False, indent=1, default=float, allow_nan=False)
+        print(f"analytics -> {args.json}")
+
+
+if __name__ == "__main__":
+    main()
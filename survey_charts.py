@@ -0,0 +1,366 @@
+"""Plotly figure builders for the dashboard.
+
+Each builder takes data that has already been aggregated (see survey_stats)
+and returns a figure, so figures can be built only for the tab being viewed
+and cached per filter state by the caller.
+
+FIGURE_CACHE is shared by every session of the server process: a figure for
+a given (dataset version, filter, chart) is built once for everyone.
+
+plotly.express is imported on first use (plotly.graph_objects is already
+loaded by Streamlit itself), which keeps it off the path to the summary
+metrics on a cold start.
+"""
+import importlib
+import logging
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.graph_objects as go
+
+logger = logging.getLogger(__name__)
+
+
+class _LazyModule:
+    """Module proxy that imports the module on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+px = _LazyModule("plotly.express")
+
+
+class FigureCache:
+    """Thread-safe LRU of built figures, capped by their serialized (JSON) size.
+
+    Figure objects are kept rather than their JSON: st.plotly_chart copies a
+    Figure with ``to_dict()`` without touching it, whereas a dict would be
+    re-validated into a new Figure on every use (which also turns numeric
+    bar labels into strings).
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        """Figure for ``key``; ``build`` returns a new plotly figure on a miss.
+
+        The returned figure is shared: callers must not modify it.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        fig = build()
+        size = len(fig.to_json())
+        with self._lock:
+            self.misses += 1
+            self._put(key, fig, size)
+        return fig
+
+    def nbytes(self, key):
+        """Serialized size of a cached figure, None if it is not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[1] if entry is not None else None
+
+    def _put(self, key, fig, size):
+        if size > self.max_bytes:
+            logger.info("figure %s (%d bytes) exceeds the cache cap, not cached", key, size)
+            return
+        if key in self._entries:
+            self.bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (fig, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self.bytes}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = self.hits = self.misses = 0
+
+
+FIGURE_CACHE = FigureCache()
+
+
+def gauge(avg_kepuasan):
+    fig_gauge = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=avg_kepuasan,
+        number={'font': {'size': 44}},
+        gauge={
+            'axis': {'range': [0, 5]},
+            'bar': {'color': "#00FFFF"},
+            'steps': [
+                {'range': [0, 2.5], 'color': "#ff4d4d"},
+                {'range': [2.5, 3.5], 'color': "#ffb84d"},
+                {'range': [3.5, 5], 'color': "#00ff99"}
+            ],
+            'threshold': {'line': {'color': "white", 'width': 4}, 'value': avg_kepuasan}
+        }
+    ))
+    fig_gauge.update_layout(height=260, paper_bgcolor="rgba(0,0,0,0)", font_color="white", margin=dict(t=20,b=10))
+    return fig_gauge
+
+
+def motivation_bar(df_motiv):
+    """Bar of respondents per motivation score (columns Skor, Jumlah)."""
+    fig_motiv = px.bar(
+        df_motiv,
+        x="Skor",
+        y="Jumlah",
+        text="Jumlah",
+        labels={"Skor": "Skor Motivasi", "Jumlah": "Jumlah Responden"},
+        title="",
+        color_discrete_sequence=["#ff77c0"]
+    )
+    return _style_small_bar(fig_motiv)
+
+
+def top_means_bar(means):
+    """Fallback for motivation_bar: the highest factor means (columns Faktor, Rata-rata)."""
+    fig_motiv = px.bar(
+        means,
+        x="Faktor",
+        y="Rata-rata",
+        text="Rata-rata",
+        title="",
+        color_discrete_sequence=["#ff77c0"]
+    )
+    return _style_small_bar(fig_motiv)
+
+
+def _style_small_bar(fig):
+    fig.update_traces(
+        textposition="outside",
+        marker_line_color="white",
+        marker_line_width=0.5
+    )
+    fig.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)",   # area plot transparan
+        paper_bgcolor="rgba(0,0,0,0)",  # latar belakang luar juga transparan
+        font_color="white",              # teks putih
+        margin=dict(t=10, b=10, l=10, r=10),
+        xaxis=dict(showgrid=False),
+        yaxis=dict(showgrid=False)
+    )
+    return fig
+
+
+def _error_bars(data, mean_col):
+    """Asymmetric error bars from the optional ``low``/``high`` columns (None without them)."""
+    if "low" not in data.columns:
+        return None
+    return dict(type="data", symmetric=False, color="white", thickness=1.5,
+                array=(data["high"] - data[mean_col]).to_numpy(), arrayminus=(data[mean_col] - data["low"]).to_numpy())
+
+
+def factor_bar(factor_means):
+    """Horizontal bar of factor means (columns Faktor, Rata_rata_Skor; optional CI low, high)."""
+    fig = px.bar(
+        factor_means,
+        y="Faktor",
+        x="Rata_rata_Skor",
+        orientation="h",
+        color_discrete_sequence=["#ff77c0"]
+    )
+    fig.update_traces(
+        text=None,  # hilangkan teks di batang
+        marker_line_color="white",
+        marker_line_width=0.5
+    )
+    if "low" in factor_means.columns:
+        fig.update_traces(error_x=_error_bars(factor_means, "Rata_rata_Skor"))
+    fig.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font_color="white",
+        margin=dict(t=10, b=10, l=10, r=10),
+        xaxis=dict(showgrid=False, title="Rata-rata Skor"),
+        yaxis=dict(showgrid=False, title="Faktor")
+    )
+    return fig
+
+
+def fakultas_bar(avg_per_fak):
+    """Mean satisfaction per Fakultas (columns Fakultas, Kepuasan_Keseluruhan; optional CI low, high)."""
+    fig_fak = px.bar(
+        avg_per_fak,
+        x="Fakultas",
+        y="Kepuasan_Keseluruhan",
+        text=avg_per_fak["Kepuasan_Keseluruhan"].round(2),
+        title="",
+        color_discrete_sequence=["#FF69B4"],
+    )
+
+    fig_fak.update_traces(
+        textposition="outside",
+        textfont=dict(color="white", size=14),
+        marker=dict(line=dict(color="white", width=1.5)),
+    )
+
+    fig_fak.update_layout(
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        font_color="white",
+        xaxis=dict(title="", tickangle=0, color="white", showgrid=False, showline=False),
+        yaxis=dict(title="Rata-rata Kepuasan", color="white", showgrid=False, showline=False),
+        margin=dict(t=10, b=40, l=40, r=40),
+        hoverlabel=dict(bgcolor="#222", font_color="white"),
+        bargap=0.3,
+    )
+
+    fig_fak.update_traces(hovertemplate="<b>%{x}</b><br>Skor: %{y:.2f}<extra></extra>")
+    if "low" in avg_per_fak.columns:
+        fig_fak.update_traces(error_y=_error_bars(avg_per_fak, "Kepuasan_Keseluruhan"), textposition="inside")
+    return fig_fak
+
+
+def fakultas_pie(pie_data):
+    fig_pie = px.pie(pie_data, values="Jumlah", names="Fakultas", title="", color_discrete_sequence=px.colors.qualitative.Pastel)
+    fig_pie.update_layout(paper_bgcolor="rgba(0,0,0,0)", font_color="white", margin=dict(t=10,b=10))
+    return fig_pie
+
+
+def stacked_contribution(stacked_melted):
+    fig_stacked = px.bar(stacked_melted, x="Fakultas", y="Skor", color="Faktor", barmode="stack", color_discrete_sequence=px.colors.qualitative.Set2)
+    fig_stacked.update_layout(paper_bgcolor="rgba(0,0,0,0)", font_color="white", margin=dict(t=10,b=10))
+    return fig_stacked
+
+
+# Scatter modes; "auto" switches from points to bubbles above LARGE_SCATTER_ROWS
+SCATTER_MODES = {
+    "auto": "Otomatis",
+    "points": "Titik per responden",
+    "webgl": "Titik (WebGL)",
+    "bubble": "Gelembung (agregat)",
+    "density": "Densitas 2D",
+}
+LARGE_SCATTER_ROWS = 5000
+
+
+def resolve_scatter_mode(mode, n_rows, max_points=LARGE_SCATTER_ROWS):
+    if mode == "auto":
+        return "points" if n_rows <= max_points else "bubble"
+    return mode
+
+
+def factor_scatter(df, factor_choice, fits=None, mode="points"):
+    """Factor vs satisfaction; ``fits`` (see survey_stats.ols_fits) adds one OLS line per Fakultas.
+
+    "points"/"webgl" send one marker per respondent. "bubble" and "density"
+    send one value per distinct (factor, satisfaction[, Fakultas]) cell, so
+    the payload stays the same size however many responses there are.
+    """
+    color = "Fakultas" if "Fakultas" in df.columns else None
+    if mode == "density":
+        counts = df.groupby([factor_choice, "Kepuasan_Keseluruhan"], observed=True).size().unstack(fill_value=0)
+        fig_scatter = go.Figure(go.Heatmap(
+            x=counts.index, y=counts.columns, z=counts.T.to_numpy(),
+            colorscale="Magma", colorbar=dict(title="Jumlah"),
+            hovertemplate="x=%{x}<br>y=%{y}<br>Jumlah=%{z}<extra></extra>",
+        ))
+        fig_scatter.update_layout(xaxis_title=factor_choice, yaxis_title="Kepuasan_Keseluruhan")
+        line_colors = dict(zip(fits.index.astype(str), px.colors.qualitative.Set1 * 3)) if fits is not None else None
+    elif mode == "bubble":
+        keys = [factor_choice, "Kepuasan_Keseluruhan"] + ([color] if color else [])
+        counts = df.groupby(keys, observed=True).size().reset_index(name="Jumlah")
+        fig_scatter = px.scatter(counts, x=factor_choice, y="Kepuasan_Keseluruhan", color=color,
+                                 size="Jumlah", size_max=40, color_discrete_sequence=px.colors.qualitative.Set1)
+        line_colors = None
+    else:
+        fig_scatter = px.scatter(df, x=factor_choice, y="Kepuasan_Keseluruhan", color=color,
+                                 render_mode="webgl" if mode == "webgl" else "auto",
+                                 color_discrete_sequence=px.colors.qualitative.Set1)
+        line_colors = None
+    if fits is not None:
+        add_trendlines(fig_scatter, fits, line_colors)
+    fig_scatter.update_layout(paper_bgcolor="rgba(0,0,0,0)", font_color="white", margin=dict(t=10,b=10))
+    return fig_scatter
+
+
+def add_trendlines(fig, fits, colors=None):
+    """One line per fitted group, coloured like the group's points unless ``colors`` is given."""
+    if colors is None:
+        colors = {trace.name: trace.marker.color for trace in fig.data}
+    for name, fit in fits.iterrows():
+        if pd.isna(fit["slope"]) or str(name) not in colors:
+            continue
+        xs = [fit["x_min"], fit["x_max"]]
+        fig.add_trace(go.Scatter(
+            x=xs,
+            y=[fit["intercept"] + fit["slope"] * x for x in xs],
+            mode="lines",
+            name=str(name),
+            legendgroup=str(name),
+            showlegend=False,
+            line=dict(color=colors[str(name)]),
+            hovertemplate=(
+                f"<b>OLS trendline</b><br>y = {fit['slope']:.4f} * x + {fit['intercept']:.4f}"
+                f"<br>R<sup>2</sup>={fit['r2']:.6f}<extra>{name}</extra>"
+            ),
+        ))
+    return fig
+
+
+def radar(radar_data):
+    """Factor means on a radar (columns Faktor, Skor); optional CI low, high are drawn as dashed bounds."""
+    fig_radar = go.Figure(data=go.Scatterpolar(r=radar_data["Skor"], theta=radar_data["Faktor"], fill='toself', line_color="#00FFFF"))
+    if "low" in radar_data.columns:
+        for bound, name in (("low", "Batas bawah IK"), ("high", "Batas atas IK")):
+            fig_radar.add_trace(go.Scatterpolar(r=radar_data[bound], theta=radar_data["Faktor"], name=name,
+                                                mode="lines", line=dict(color="#ff77c0", dash="dot", width=1)))
+    fig_radar.update_layout(polar={'radialaxis': {'range': [0, 5]}}, paper_bgcolor="rgba(0,0,0,0)", font_color="white", margin=dict(t=10,b=10))
+    return fig_radar
+
+
+def satisfaction_histogram(df, avg_all):
+    fig_hist = px.histogram(df, x="Kepuasan_Keseluruhan", nbins=10, title="", color_discrete_sequence=["#ff77c0"])
+    fig_hist.add_vline(x=avg_all, line_dash="dash", line_color="#00FFFF", annotation_text=f"Rata-rata: {avg_all:.2f}", annotation_position="top right")
+    fig_hist.update_layout(paper_bgcolor="rgba(0,0,0,0)", font_color="white", margin=dict(t=10,b=10))
+    return fig_hist
+
+
+def comparison_means(means):
+    """Grouped bars of factor means, one colour per segment (``means``: factor x segment)."""
+    long = means.rename_axis("Faktor").reset_index().melt(id_vars="Faktor", var_name="Segmen", value_name="Rata-rata")
+    fig = px.bar(long, x="Faktor", y="Rata-rata", color="Segmen", barmode="group", color_discrete_sequence=px.colors.qualitative.Set2)
+    fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="white", margin=dict(t=10,b=10),
+                      xaxis=dict(showgrid=False, title=""), yaxis=dict(showgrid=False, range=[0, 5]))
+    return fig
+
+
+def comparison_distribution(distribution):
+    """Share of each satisfaction score per segment (``distribution``: score x segment, 0-1)."""
+    long = (distribution * 100).rename_axis("Skor").reset_index().melt(id_vars="Skor", var_name="Segmen", value_name="Persentase")
+    fig = px.bar(long, x="Skor", y="Persentase", color="Segmen", barmode="group", color_discrete_sequence=px.colors.qualitative.Set2)
+    fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="white", margin=dict(t=10,b=10),
+                      xaxis=dict(showgrid=False, title="Skor Kepuasan", dtick=1), yaxis=dict(showgrid=False, title="% Responden"))
+    return fig
+
+
+def correlation_heatmap(corr):
+    fig_heat = px.imshow(corr, text_auto=True, color_continuous_scale="RdYlGn", aspect="auto")
+    fig_heat.update_layout(paper_bgcolor="rgba(0,0,0,0)", font_color="white", margin=dict(t=10,b=10))
+    return fig_heat
@@ -0,0 +1,663 @@
+"""Loading and normalization of the Twin Tower survey data.
+
+Streamlit reruns QTELAdashboard.py on every widget interaction, but imported
+modules stay alive for the whole server process. Parsed and normalized frames
+are therefore cached here, keyed by a fingerprint of their source, so every
+session and every rerun shares a single parse until the source changes.
+
+processed_survey_data.csv stores every column twice: the raw answers followed
+by a mirrored block (pandas mangles those names to ``<col>.1``). Only a few
+mirrored columns actually differ (they are z-scores); the rest are exact
+copies. Loading goes through an explicit compact schema and returns the raw
+block and the standardized block as two separate frames.
+
+A columnar copy of the CSV (Parquet, or memory-mapped Feather/Arrow) can be
+written with ``python survey_data.py``; when it is at least as new as the
+CSV it is loaded instead, reading only the requested columns.
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import logging
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DATA_FILENAME = "processed_survey_data.csv"
+# Columnar copies of the CSV, in order of preference
+STORE_FORMATS = ["parquet", "feather"]
+REQUIRED_MIN = ["Fakultas", "Kepuasan_Keseluruhan"]
+
+# Alternative spellings seen in survey exports -> canonical column name
+COLUMN_ALIASES = {
+    "Program_Studi": "Prodi",
+    "Program Studi": "Prodi",
+    "ProgramStudy": "Prodi",
+    "Kepuasan": "Kepuasan_Keseluruhan",
+}
+
+
+# ===============================
+# Schema
+# ===============================
+# 1-5 Likert answers
+LIKERT_COLUMNS = [
+    "Kualitas_Internet", "Ketersediaan_Fasilitas", "Peningkatan_Motivasi", "Fasilitas_Lift",
+    "Jam_Operasional", "Kepuasan_Keseluruhan", "Peningkatan_Fokus", "Peningkatan_Konsentrasi",
+    "Ketersediaan_Sumber_Belajar",
+]
+# Small coded answers (0/1/2)
+CODED_COLUMNS = [
+    "Pilihan_Twin_Tower", "Kesediaan_Isi_Survei", "Fasilitas_Difabel", "Diskusi_Kelompok",
+    "Peningkatan_Citra", "Lingkungan_Lebih_Baik",
+]
+CATEGORY_COLUMNS = ["Fakultas", "Prodi", "Sarana_Prasarana_Stres"]
+FLOAT_COLUMNS = ["Jam_Minggu_Akademik", "Durasi_GF_Kelas", "Durasi_GF_log", "Jam_Minggu_log"]
+# Columns whose mirrored copy holds standardized values instead of a duplicate
+STANDARDIZED_COLUMNS = ["Jam_Minggu_Akademik", "Durasi_GF_Kelas"]
+MIRROR_SUFFIX = ".1"
+
+# Valid answer ranges, checked when a batch is appended
+VALUE_RANGES = {
+    **{c: (1, 5) for c in LIKERT_COLUMNS},
+    **{c: (0, 2) for c in CODED_COLUMNS},
+}
+
+SCHEMA = {
+    **{c: "int8" for c in LIKERT_COLUMNS + CODED_COLUMNS},
+    **{c: "category" for c in CATEGORY_COLUMNS},
+    **{c: "float32" for c in FLOAT_COLUMNS},
+}
+
+# Standardized copies get this suffix when placed next to the raw columns
+STANDARDIZED_SUFFIX = "_z"
+# Every numeric column available for aggregates/correlations (see numeric_frame)
+ANALYSIS_COLUMNS = (
+    LIKERT_COLUMNS + CODED_COLUMNS + FLOAT_COLUMNS
+    + [c + STANDARDIZED_SUFFIX for c in STANDARDIZED_COLUMNS]
+)
+
+
+class SurveyData(NamedTuple):
+    """Raw answers and standardized copies, index-aligned, same column names.
+
+    ``version`` is the source fingerprint; derived caches key on it.
+    """
+    raw: pd.DataFrame
+    standardized: pd.DataFrame
+    version: tuple = None
+
+
+def numeric_frame(data):
+    """Raw block plus the standardized block as ``<col>_z`` columns, index-aligned."""
+    if not len(data.standardized.columns):
+        return data.raw
+    return pd.concat([data.raw, data.standardized.add_suffix(STANDARDIZED_SUFFIX)], axis=1)
+
+
+def normalize_columns(df):
+    """Rename alias columns to their canonical name (only if it is absent)."""
+    col_renames = {}
+    for alias, canonical in COLUMN_ALIASES.items():
+        if alias in df.columns and canonical not in df.columns:
+            col_renames[alias] = canonical
+    if col_renames:
+        df = df.rename(columns=col_renames)
+    return df
+
+
+def missing_required(df):
+    return [c for c in REQUIRED_MIN if c not in df.columns]
+
+
+def _canonical(name, header_set):
+    """Canonical name of a header column (aliases map only if the canonical one is absent)."""
+    alias = COLUMN_ALIASES.get(name)
+    return alias if alias and alias not in header_set else name
+
+
+def _coerce(series, dtype):
+    """Best-effort cast used when the fast typed parse rejects a file."""
+    if dtype == "category":
+        return series.astype("category")
+    values = pd.to_numeric(series, errors="coerce")
+    if dtype == "int8" and values.notna().all() and values.between(-128, 127).all() \
+            and (values % 1 == 0).all():
+        return values.astype("int8")
+    return values.astype("float32")
+
+
+def _read_survey(make_source, columns=None):
+    """Read a survey CSV through SCHEMA.
+
+    ``make_source`` returns a fresh path/buffer for each read (the header is
+    read first to resolve mirrored and alias names). ``columns`` limits the
+    parse to those canonical columns (``usecols``); None reads everything
+    except the duplicated half of the mirrored block.
+    """
+    header = list(pd.read_csv(make_source(), nrows=0).columns)
+    usecols, dtypes, mirrored = _plan_columns(header, columns)
+
+    try:
+        df = pd.read_csv(make_source(), usecols=usecols, dtype=dtypes)
+    except (ValueError, TypeError):
+        # Missing values or stray text in a typed column: parse untyped, then cast per column
+        df = pd.read_csv(make_source(), usecols=usecols)
+        for name, dtype in dtypes.items():
+            df[name] = _coerce(df[name], dtype)
+    return _split(df, mirrored)
+
+
+def _plan_columns(header, columns=None):
+    """(usecols, dtypes, mirrored name -> base name) for a CSV header."""
+    header_set = set(header)
+    wanted = None if columns is None else set(columns)
+    usecols, dtypes, mirrored = [], {}, {}
+    for name in header:
+        base = name[:-len(MIRROR_SUFFIX)] if name.endswith(MIRROR_SUFFIX) else None
+        if base is not None and base in header_set:
+            canon = _canonical(base, header_set)
+            if canon not in STANDARDIZED_COLUMNS:
+                continue
+        else:
+            canon = _canonical(name, header_set)
+        if wanted is not None and canon not in wanted:
+            continue
+        if base is not None and base in header_set:
+            mirrored[name] = base
+        usecols.append(name)
+        if canon in SCHEMA:
+            dtypes[name] = SCHEMA[canon]
+    return usecols, dtypes, mirrored
+
+
+def _split(df, mirrored):
+    """SurveyData from a parsed frame; ``mirrored`` maps standardized column names to their base."""
+    raw_cols = [c for c in df.columns if c not in mirrored]
+    raw = normalize_columns(df[raw_cols])
+    standardized = normalize_columns(df[list(mirrored)].rename(columns=mirrored))
+    return SurveyData(raw, standardized)
+
+
+# ===============================
+# Fingerprints
+# ===============================
+def file_fingerprint(path):
+    """(path, mtime, size) — changes whenever the file is rewritten."""
+    stat = os.stat(path)
+    return ("file", os.path.abspath(path), (stat.st_mtime_ns, stat.st_size))
+
+
+def bytes_fingerprint(data):
+    """Content hash for uploaded bytes (uploads have no stable path/mtime)."""
+    return ("bytes", hashlib.sha1(data).hexdigest(), len(data))
+
+
+def buffer_fingerprint(buffer, block_size=1 << 20):
+    """Same as ``bytes_fingerprint`` for a seekable binary buffer, read block by block."""
+    digest, size = hashlib.sha1(), 0
+    buffer.seek(0)
+    for block in iter(lambda: buffer.read(block_size), b""):
+        digest.update(block)
+        size += len(block)
+    buffer.seek(0)
+    return ("bytes", digest.hexdigest(), size)
+
+
+# ===============================
+# Process-wide frame cache
+# ===============================
+class _FrameCache:
+    """Small thread-safe LRU of parsed frames with hit/miss counters."""
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per key being parsed; dropped once nobody holds it
+        self._loading = weakref.WeakValueDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                logger.debug("data cache hit: %s", key[:2])
+                return self._entries[key]
+            return None
+
+    def get_or_load(self, key, loader):
+        df = self._lookup(key)
+        if df is not None:
+            return df
+        with self._lock:
+            loading = self._loading.setdefault(key, threading.Lock())
+        # Parse outside the cache lock so other sources are not blocked; callers
+        # asking for the same key wait for the first parse instead of repeating it
+        with loading:
+            df = self._lookup(key)
+            if df is not None:
+                return df
+            df = loader()
+            with self._lock:
+                self.misses += 1
+                logger.info("data cache miss: %s", key[:2])
+            self.put(key, df)
+        return df
+
+    def put(self, key, df):
+        with self._lock:
+            # A source has one live version; drop entries of older versions
+            for old in [k for k in self._entries if k[:2] == key[:2] and k[2] != key[2]]:
+                del self._entries[old]
+            self._entries[key] = df
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_cache = _FrameCache()
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+def clear_cache():
+    _cache.clear()
+
+
+# ===============================
+# Public loaders
+# ===============================
+def _columns_key(columns):
+    return None if columns is None else tuple(sorted(columns))
+
+
+def load_csv(path=DATA_FILENAME, columns=None):
+    """SurveyData for a CSV on disk, optionally limited to ``columns``.
+
+    The returned frames are shared between sessions: treat them as read-only.
+    """
+    key = file_fingerprint(path) + (_columns_key(columns),)
+    return _cache.get_or_load(key, lambda: _read_survey(lambda: path, columns)._replace(version=key))
+
+
+def store_path(csv_path, fmt):
+    return os.path.splitext(csv_path)[0] + "." + fmt
+
+
+def local_source(csv_path=DATA_FILENAME):
+    """Path to load for ``csv_path``: a columnar copy if one is up to date, else the CSV.
+
+    A store older than the CSV (e.g. after ``append_csv``) is ignored until
+    it is converted again. None when neither exists.
+    """
+    csv_mtime = os.stat(csv_path).st_mtime_ns if os.path.exists(csv_path) else None
+    for fmt in STORE_FORMATS:
+        path = store_path(csv_path, fmt)
+        if os.path.exists(path) and (csv_mtime is None or os.stat(path).st_mtime_ns >= csv_mtime):
+            return path
+    return csv_path if csv_mtime is not None else None
+
+
+def _read_store(path, columns=None):
+    """Read a Parquet/Feather store written by ``convert``, pruning columns."""
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    is_parquet = path.endswith(".parquet")
+    if is_parquet:
+        names = pq.read_schema(path).names
+    else:
+        with pa.memory_map(path) as source:
+            names = pa.ipc.open_file(source).schema.names
+    names = [n for n in names if n != "__index_level_0__"]
+    wanted = None if columns is None else set(columns)
+    selected = [
+        n for n in names
+        if wanted is None or (n[:-len(MIRROR_SUFFIX)] if n.endswith(MIRROR_SUFFIX) else n) in wanted
+    ]
+    if is_parquet:
+        table = pq.read_table(path, columns=selected)
+    else:
+        table = feather.read_table(path, columns=selected, memory_map=True)
+    df = table.to_pandas()
+    mirrored = {n: n[:-len(MIRROR_SUFFIX)] for n in df.columns if n.endswith(MIRROR_SUFFIX)}
+    raw = df[[c for c in df.columns if c not in mirrored]]
+    standardized = df[list(mirrored)].rename(columns=mirrored)
+    return SurveyData(raw, standardized)
+
+
+def load_store(path, columns=None):
+    """SurveyData from a columnar store, cached like ``load_csv``."""
+    key = file_fingerprint(path) + (_columns_key(columns),)
+    return _cache.get_or_load(key, lambda: _read_store(path, columns)._replace(version=key))
+
+
+def load_file(path, columns=None):
+    """Load a CSV or columnar store, chosen by extension."""
+    if os.path.splitext(path)[1].lstrip(".") in STORE_FORMATS:
+        return load_store(path, columns)
+    return load_csv(path, columns)
+
+
+def convert(csv_path=DATA_FILENAME, fmt="parquet"):
+    """Write the typed, de-duplicated dataset next to ``csv_path`` as Parquet or Feather.
+
+    The standardized block is stored as ``<col>.1`` columns, matching the
+    mangled CSV names. Returns the path written.
+    """
+    data = _read_survey(lambda: csv_path)
+    frame = pd.concat([data.raw, data.standardized.add_suffix(MIRROR_SUFFIX)], axis=1)
+    path = store_path(csv_path, fmt)
+    if fmt == "parquet":
+        frame.to_parquet(path, index=False)
+    elif fmt == "feather":
+        # Uncompressed so it can be memory-mapped without a decode step
+        frame.to_feather(path, compression="uncompressed")
+    else:
+        raise ValueError(f"Unknown store format: {fmt}")
+    logger.info("wrote %s (%d rows)", path, len(frame))
+    return path
+
+
+def load_uploaded(data, columns=None):
+    """SurveyData for the bytes of an uploaded CSV."""
+    key = bytes_fingerprint(data) + (_columns_key(columns),)
+    return _cache.get_or_load(key, lambda: _read_survey(lambda: io.BytesIO(data), columns)._replace(version=key))
+
+
+# ===============================
+# Append-only ingestion
+# ===============================
+def validate_batch(batch, reference):
+    """Problems that prevent appending ``batch`` (raw frame) to ``reference``; empty if none."""
+    problems = []
+    missing = [c for c in reference.columns if c not in batch.columns]
+    unknown = [c for c in batch.columns if c not in reference.columns]
+    if missing:
+        problems.append(f"Kolom tidak ada di batch: {missing}")
+    if unknown:
+        problems.append(f"Kolom tidak dikenal: {unknown}")
+    for col in reference.columns.intersection(batch.columns):
+        values, dtype = batch[col], reference[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            continue
+        if not pd.api.types.is_numeric_dtype(values):
+            problems.append(f"Kolom {col} harus numerik")
+            continue
+        # Integer columns must stay integer: no blanks, no fractional answers
+        if pd.api.types.is_integer_dtype(dtype) and (values.isna().any() or (values % 1 != 0).any()):
+            problems.append(f"Kolom {col} harus bilangan bulat tanpa nilai kosong")
+        if col in VALUE_RANGES:
+            low, high = VALUE_RANGES[col]
+            if ((values < low) | (values > high)).any():
+                problems.append(f"Nilai {col} di luar rentang {low}-{high}")
+    absent = missing_required(batch)
+    empty = [c for c in REQUIRED_MIN if c not in absent and batch[c].isna().any()]
+    if absent:
+        problems.append(f"Kolom wajib tidak ada: {absent}")
+    if empty:
+        problems.append(f"Kolom wajib kosong: {empty}")
+    return problems
+
+
+def _concat(frames):
+    """Concatenate frames keeping categorical columns categorical."""
+    frames = [f for f in frames if len(f.columns)]
+    if not frames:
+        return pd.DataFrame()
+    out = []
+    for frame in frames:
+        frame = frame.copy()
+        for col in frame.columns:
+            cats = [f[col].cat.categories for f in frames if col in f and isinstance(f[col].dtype, pd.CategoricalDtype)]
+            if cats:
+                union = cats[0]
+                for c in cats[1:]:
+                    union = union.union(c)
+                frame[col] = frame[col].astype(pd.CategoricalDtype(union))
+        out.append(frame)
+    return pd.concat(out, ignore_index=True)
+
+
+def _standardize_like(raw, standardized, batch_raw):
+    """Standardized block for new rows, using the z-score parameters of the existing data.
+
+    Each standardized column is an exact linear function of its raw column,
+    so the offset/scale are recovered from the rows already stored.
+    """
+    out = {}
+    for col in standardized.columns:
+        x = raw[col].to_numpy(dtype="float64")
+        z = standardized[col].to_numpy(dtype="float64")
+        ok = ~(np.isnan(x) | np.isnan(z))
+        if ok.sum() >= 2 and np.ptp(x[ok]) > 0:
+            scale, offset = np.polyfit(x[ok], z[ok], 1)
+            out[col] = (offset + scale * batch_raw[col].astype("float64")).astype("float32")
+        else:
+            out[col] = pd.Series(np.nan, index=batch_raw.index, dtype="float32")
+    return pd.DataFrame(out, index=batch_raw.index)
+
+
+_append_lock = threading.Lock()
+
+
+def append_csv(batch, path=DATA_FILENAME):
+    """Append a validated batch (SurveyData) to the CSV at ``path``.
+
+    Rows are written in the file's own layout (raw block + mirrored block) and
+    the cached frames are extended in memory instead of re-reading history.
+    Appends are serialized, so each one extends the rows of the previous.
+    Returns the updated SurveyData; its ``version`` is the file's new
+    fingerprint.
+    """
+    with _append_lock:
+        return _append_locked(batch, path)
+
+
+def _append_locked(batch, path):
+    current = load_csv(path)
+    problems = validate_batch(batch.raw, current.raw)
+    if problems:
+        raise ValueError("; ".join(problems))
+    batch_raw = batch.raw[list(current.raw.columns)].astype({
+        c: dtype for c, dtype in current.raw.dtypes.items() if not isinstance(dtype, pd.CategoricalDtype)
+    })
+    # The batch's own z-scores may be standardized against the batch alone
+    batch_std = _standardize_like(current.raw, current.standardized, batch_raw)
+    updated_raw = _concat([current.raw, batch_raw])
+    changed = [
+        c for c, dtype in current.raw.dtypes.items()
+        if not isinstance(dtype, pd.CategoricalDtype) and updated_raw[c].dtype != dtype
+    ]
+    if changed:
+        raise ValueError(f"Batch mengubah tipe kolom: {changed}")
+
+    header = list(pd.read_csv(path, nrows=0).columns)
+    header_set = set(header)
+    parts = []
+    for name in header:
+        base = name[:-len(MIRROR_SUFFIX)] if name.endswith(MIRROR_SUFFIX) else None
+        if base is not None and base in header_set:
+            canon = _canonical(base, header_set)
+            source = batch_std if canon in batch_std.columns else batch_raw
+        else:
+            canon = _canonical(name, header_set)
+            source = batch_raw
+        parts.append(source[canon].reset_index(drop=True))
+    rows = pd.concat(parts, axis=1, ignore_index=True)
+    needs_newline = False
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+    payload = ("\n" if needs_newline else "") + rows.to_csv(header=False, index=False)
+    if file_fingerprint(path) != current.version[:3]:
+        raise ValueError("File data berubah saat batch diproses; coba lagi.")
+    size = os.path.getsize(path)
+    payload = payload.encode("utf-8")
+    with open(path, "ab") as f:
+        f.write(payload)
+
+    key = file_fingerprint(path) + (None,)
+    updated = SurveyData(
+        raw=updated_raw,
+        standardized=_concat([current.standardized, batch_std]),
+        version=key,
+    )
+    # Only cache the extended frames if the file holds exactly history + this batch
+    # (another process may have written to it meanwhile)
+    if key[2][1] == size + len(payload):
+        _cache.put(key, updated)
+    else:
+        updated = load_csv(path)
+    logger.info("appended %d rows to %s", len(batch_raw), path)
+    return updated
+
+
+# ===============================
+# Streaming (chunked) ingestion
+# ===============================
+CHUNK_ROWS = 100_000
+# Uploads above this size are processed chunk by chunk by default
+STREAMING_UPLOAD_BYTES = 50 * 1024 * 1024
+
+
+def iter_csv_chunks(make_source, columns=None, chunksize=CHUNK_ROWS):
+    """Yield SurveyData chunks of a CSV without materializing the whole file.
+
+    The header is checked before any row is parsed: a file missing the
+    required columns raises ValueError straight away.
+    """
+    header = list(pd.read_csv(make_source(), nrows=0).columns)
+    usecols, dtypes, mirrored = _plan_columns(header, columns)
+    canonical = {_canonical(n, set(header)) for n in header}
+    missing = [c for c in REQUIRED_MIN if c not in canonical]
+    if missing:
+        raise ValueError(f"Kolom wajib tidak ditemukan di file CSV: {missing}")
+    # Untyped parse + per-chunk cast: a bad value in one chunk must not abort the stream
+    for df in pd.read_csv(make_source(), usecols=usecols, chunksize=chunksize):
+        for name, dtype in dtypes.items():
+            df[name] = _coerce(df[name], dtype)
+        yield _split(df, mirrored)
+
+
+class Reservoir:
+    """Uniform random sample of at most ``size`` rows from a stream of SurveyData chunks.
+
+    Every row gets a random key and the ``size`` smallest keys are kept
+    (bottom-k sampling), so memory stays bounded by ``size`` rows.
+    """
+
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.rows_seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._sample = None
+        self._std_columns = []
+
+    def add(self, chunk):
+        self._std_columns = list(chunk.standardized.columns)
+        frame = pd.concat([chunk.raw, chunk.standardized.add_suffix(MIRROR_SUFFIX)], axis=1)
+        frame = frame.assign(_key=self._rng.random(len(frame)),
+                             _row=np.arange(self.rows_seen, self.rows_seen + len(frame)))
+        self.rows_seen += len(frame)
+        if self._sample is not None:
+            frame = _concat([self._sample, frame])
+        self._sample = frame.nsmallest(self.size, "_key") if len(frame) > self.size else frame
+
+    def result(self):
+        """The sample as SurveyData, in original row order."""
+        if self._sample is None:
+            return SurveyData(pd.DataFrame(), pd.DataFrame())
+        frame = self._sample.sort_values("_row").drop(columns=["_key", "_row"]).reset_index(drop=True)
+        mirrored = {c + MIRROR_SUFFIX: c for c in self._std_columns}
+        return _split(frame, mirrored)
+
+
+# ===============================
+# Export
+# ===============================
+# Download formats: key -> (label, mime type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("CSV", "text/csv", ".csv"),
+    "csv.gz": ("CSV (gzip)", "application/gzip", ".csv.gz"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet", ".parquet"),
+}
+EXPORT_CHUNK_ROWS = 50_000
+
+
+def export_frame(data, columns, rows=None):
+    """Chosen columns (raw names, or ``<col>_z`` for standardized copies) for ``rows`` (index labels)."""
+    standardized = {c + STANDARDIZED_SUFFIX: c for c in data.standardized.columns}
+    raw_cols = [c for c in columns if c not in standardized]
+    std_cols = [c for c in columns if c in standardized]
+    # Select the rows first: a small filtered download never copies the whole dataset
+    raw = data.raw[raw_cols] if rows is None else data.raw.loc[rows, raw_cols]
+    std = data.standardized[[standardized[c] for c in std_cols]]
+    std = (std if rows is None else std.loc[rows]).set_axis(std_cols, axis=1)
+    return pd.concat([raw, std], axis=1)[list(columns)]
+
+
+def export_bytes(df, fmt="csv", chunk_rows=EXPORT_CHUNK_ROWS):
+    """``df`` as a file in one of EXPORT_FORMATS, serialized ``chunk_rows`` rows at a time.
+
+    Only the output (compressed for csv.gz/parquet) and one chunk are held
+    in memory, never a text copy of the whole frame.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format: {fmt}")
+    out = io.BytesIO()
+    starts = range(0, max(len(df), 1), chunk_rows)
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        for start in starts:
+            table = pa.Table.from_pandas(df.iloc[start:start + chunk_rows], preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(out, table.schema)
+            writer.write_table(table)
+        writer.close()
+        return out.getvalue()
+
+    sink = gzip.GzipFile(fileobj=out, mode="wb", mtime=0) if fmt == "csv.gz" else out
+    for start in starts:
+        chunk = df.iloc[start:start + chunk_rows]
+        sink.write(chunk.to_csv(index=False, header=start == 0).encode())
+    if sink is not out:
+        sink.close()
+    return out.getvalue()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the survey CSV to a columnar store.")
+    parser.add_argument("csv", nargs="?", default=DATA_FILENAME)
+    parser.add_argument("--format", choices=STORE_FORMATS, default="parquet")
+    args = parser.parse_args()
+    print(convert(args.csv, args.format))
@@ -0,0 +1,107 @@
+"""Per-section timing of one dashboard run.
+
+QTELAdashboard.py creates a SectionTimer at the top of every rerun and wraps
+each section (data load, aggregates, every chart, download) in
+``timer.section(name, rows)``. Figure payload sizes are attributed to the
+section that is open when the figure is fetched.
+
+Records are shown in the sidebar performance panel when it is switched on,
+and appended as one JSON line per rerun to the file named by the
+DASHBOARD_METRICS_FILE environment variable, if set.
+
+The first run in a server process is the cold start: its timings are kept
+in COLD_START and logged. This module only uses the standard library at
+import time so the dashboard can start its timer before the heavy imports.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+METRICS_FILE_ENV = "DASHBOARD_METRICS_FILE"
+# Cold start of this process: seconds to first paint and to the end of the first run
+COLD_START = {}
+_runs = 0
+_runs_lock = threading.Lock()
+
+
+class SectionTimer:
+    """Wall time, rows processed and figure payload bytes per section."""
+
+    def __init__(self):
+        global _runs
+        with _runs_lock:
+            self.cold = _runs == 0
+            _runs += 1
+        self.records = []
+        self.marks = {}
+        self._open = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def section(self, name, rows=None):
+        """Time the block; the yielded record's ``rows`` may be set inside it."""
+        record = {"section": name, "rows": rows, "bytes": 0, "seconds": 0.0}
+        self._open.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            self._open.pop()
+            self.records.append(record)
+
+    def add_bytes(self, nbytes):
+        """Attribute a payload to the innermost open section."""
+        if self._open and nbytes:
+            self._open[-1]["bytes"] += nbytes
+
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def mark(self, name):
+        """Elapsed time at the first call for ``name`` (e.g. "first_paint")."""
+        self.marks.setdefault(name, self.elapsed())
+
+    def finish(self):
+        """End of the run; the first run of the process is stored as COLD_START."""
+        if self.cold and not COLD_START:
+            COLD_START.update({k: round(v, 6) for k, v in self.marks.items()})
+            COLD_START["total"] = round(self.elapsed(), 6)
+            logger.info("cold start: %s", COLD_START)
+
+    def frame(self):
+        import pandas as pd
+
+        columns = ["section", "rows", "bytes", "seconds"]
+        return pd.DataFrame(self.records, columns=columns)
+
+    def export(self, path=None, **context):
+        """Append this run as one JSON line (``context`` e.g. the active filter).
+
+        ``path`` defaults to $DASHBOARD_METRICS_FILE; nothing is written when
+        neither is set. Returns the path written to, or None.
+        """
+        path = path or os.environ.get(METRICS_FILE_ENV)
+        if not path:
+            return None
+        line = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "total_seconds": round(self.elapsed(), 6),
+            "cold": self.cold,
+            "marks": {k: round(v, 6) for k, v in self.marks.items()},
+            **context,
+            "sections": [{**r, "seconds": round(r["seconds"], 6)} for r in self.records],
+        }
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            logger.warning("cannot write metrics to %s: %s", path, e)
+            return None
+        return path
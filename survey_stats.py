@@ -0,0 +1,900 @@
+"""Precomputed aggregates for the dashboard filters.
+
+Every chart in the dashboard is a mean, a count, a value histogram or a
+Pearson correlation over the rows selected by the Fakultas/Prodi sidebar
+filters. All of those can be assembled from sufficient statistics, so the
+cube below computes them once per dataset for every (Fakultas, Prodi)
+combination — including the "Semua" roll-ups — and a filter change becomes a
+dictionary lookup instead of a rescan of the rows.
+
+Nothing here depends on Streamlit: precompute.py builds the same cube in a
+process pool and stores it as a snapshot that the dashboard loads on start.
+"""
+import copy
+import gzip
+import logging
+import os
+import pickle
+import threading
+import warnings
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ALL = "Semua"
+GROUP_COLUMNS = ["Fakultas", "Prodi"]
+TARGET = "Kepuasan_Keseluruhan"
+# Factors compared across the dashboard
+CANDIDATE_FACTORS = [
+    "Kualitas_Internet", "Ketersediaan_Fasilitas", "Jam_Operasional", "Peningkatan_Motivasi",
+    "Lingkungan_Lebih_Baik", "Fasilitas_Difabel", "Diskusi_Kelompok", "Peningkatan_Citra"
+]
+# Factors shown in the stacked per-Fakultas contribution chart
+STACKED_FACTORS = ["Kualitas_Internet", "Ketersediaan_Fasilitas", "Jam_Operasional", "Peningkatan_Motivasi"]
+# Columns with at most this many distinct values also get a value histogram
+MAX_HIST_LEVELS = 32
+
+
+def filter_rows(df, fakultas=ALL, prodi=ALL):
+    """Rows of the sidebar filter (boolean masks, no copy of the full frame)."""
+    mask = np.ones(len(df), dtype=bool)
+    if fakultas != ALL and "Fakultas" in df.columns:
+        mask &= (df["Fakultas"] == fakultas).to_numpy()
+    if prodi != ALL and "Prodi" in df.columns:
+        mask &= (df["Prodi"] == prodi).to_numpy()
+    return df[mask]
+
+
+def factor_ranking(means):
+    """Factor means sorted high to low (columns Faktor, Rata_rata_Skor), rounded for display.
+
+    ``head(5)``/``tail(5)`` give the top and bottom factors.
+    """
+    ranking = means.sort_values(ascending=False).reset_index()
+    ranking.columns = ["Faktor", "Rata_rata_Skor"]
+    ranking["Rata_rata_Skor"] = ranking["Rata_rata_Skor"].round(2)
+    return ranking
+
+
+def stacked_contribution(fakultas_means, factors):
+    """Long-format per-Fakultas factor means (columns Fakultas, Faktor, Skor)."""
+    return fakultas_means[["Fakultas"] + list(factors)].melt(id_vars="Fakultas", var_name="Faktor", value_name="Skor")
+
+
+def compute_levels(df, columns):
+    """Distinct values of each low-cardinality column (histogram bins)."""
+    levels = {}
+    for col in columns:
+        values = np.unique(df[col].dropna().to_numpy())
+        if len(values) <= MAX_HIST_LEVELS:
+            levels[col] = values
+    return levels
+
+
+@dataclass
+class Aggregates:
+    """Sufficient statistics for one set of rows.
+
+    The pairwise matrices only count rows where both columns are present, so
+    correlations match ``DataFrame.corr()`` (pairwise-complete Pearson). Their
+    diagonals are the per-column count, sum and sum of squares.
+    """
+    columns: list
+    n: int
+    pair_n: np.ndarray       # [i, j] rows where i and j are both present
+    pair_sum: np.ndarray     # [i, j] sum of x_i over those rows
+    pair_sumsq: np.ndarray   # [i, j] sum of x_i**2 over those rows
+    cross: np.ndarray        # [i, j] sum of x_i * x_j
+    minimum: np.ndarray      # per column, +inf when no value is present
+    maximum: np.ndarray      # per column, -inf when no value is present
+    hist: dict = field(default_factory=dict)  # column -> counts aligned with AggregateCube.levels
+
+    @classmethod
+    def from_frame(cls, df, columns, levels):
+        return grouped_aggregates(df, columns, levels)[0]
+
+    def __add__(self, other):
+        return Aggregates(
+            columns=self.columns,
+            n=self.n + other.n,
+            pair_n=self.pair_n + other.pair_n,
+            pair_sum=self.pair_sum + other.pair_sum,
+            pair_sumsq=self.pair_sumsq + other.pair_sumsq,
+            cross=self.cross + other.cross,
+            minimum=np.fmin(self.minimum, other.minimum),
+            maximum=np.fmax(self.maximum, other.maximum),
+            hist={c: h + other.hist[c] for c, h in self.hist.items()},
+        )
+
+    def _idx(self, columns):
+        if columns is None:
+            return list(range(len(self.columns))), list(self.columns)
+        columns = list(columns)
+        return [self.columns.index(c) for c in columns], columns
+
+    @property
+    def count(self):
+        return pd.Series(np.diag(self.pair_n), index=self.columns)
+
+    def means(self, columns=None):
+        idx, columns = self._idx(columns)
+        count = np.diag(self.pair_n)[idx]
+        total = np.diag(self.pair_sum)[idx]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.Series(np.where(count > 0, total / count, np.nan), index=columns)
+
+    def mean(self, column):
+        return self.means([column]).iloc[0]
+
+    def value_counts(self, column, levels):
+        """Counts per observed value (index sorted), like ``value_counts().sort_index()``."""
+        counts = pd.Series(self.hist[column], index=levels)
+        return counts[counts > 0]
+
+    def corr(self, columns=None):
+        idx, columns = self._idx(columns)
+        ix = np.ix_(idx, idx)
+        n = self.pair_n[ix]
+        s_i, s_j = self.pair_sum[ix], self.pair_sum.T[ix]
+        q_i, q_j = self.pair_sumsq[ix], self.pair_sumsq.T[ix]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            num = n * self.cross[ix] - s_i * s_j
+            den = np.sqrt((n * q_i - s_i ** 2) * (n * q_j - s_j ** 2))
+            r = np.where(den > 0, num / den, np.nan)
+        r = np.clip(r, -1.0, 1.0)
+        diag = np.diag(r).copy()
+        np.fill_diagonal(r, np.where(np.isnan(diag), np.nan, 1.0))
+        return pd.DataFrame(r, index=columns, columns=columns)
+
+
+def grouped_aggregates(df, columns, levels, cell_ids=None, n_cells=1):
+    """Aggregates for every cell of ``cell_ids`` in one pass over the rows.
+
+    The factor matrix is converted to NumPy once and its rows sorted by cell,
+    so each cell is a contiguous block for the matrix products, and the value
+    histograms of all cells come out of a single ``bincount`` per column.
+    """
+    columns = list(columns)
+    X = df[columns].to_numpy(dtype="float64")
+    if cell_ids is None:
+        cell_ids = np.zeros(len(X), dtype="int64")
+    order = np.argsort(cell_ids, kind="stable")
+    X, cell_ids = X[order], cell_ids[order]
+    bounds = np.searchsorted(cell_ids, np.arange(n_cells + 1))
+
+    present = ~np.isnan(X)
+    M = present.astype("float64")
+    X0 = np.where(present, X, 0.0)
+    X0sq = X0 * X0
+
+    hists = {}
+    for i, col in enumerate(columns):
+        if col in levels:
+            rows = present[:, i]
+            idx = np.searchsorted(levels[col], X[rows, i])
+            flat = cell_ids[rows] * len(levels[col]) + idx
+            hists[col] = np.bincount(flat, minlength=n_cells * len(levels[col])).reshape(n_cells, len(levels[col]))
+
+    out = []
+    for c in range(n_cells):
+        block = slice(bounds[c], bounds[c + 1])
+        Mc, Xc = M[block], X0[block]
+        # fmin/fmax skip NaN; the +-inf initial value marks "no value"
+        minimum = np.fmin.reduce(X[block], axis=0, initial=np.inf)
+        maximum = np.fmax.reduce(X[block], axis=0, initial=-np.inf)
+        out.append(Aggregates(
+            columns=columns,
+            n=int(bounds[c + 1] - bounds[c]),
+            pair_n=Mc.T @ Mc,
+            pair_sum=Xc.T @ Mc,
+            pair_sumsq=X0sq[block].T @ Mc,
+            cross=Xc.T @ Xc,
+            minimum=minimum,
+            maximum=maximum,
+            hist={col: h[c] for col, h in hists.items()},
+        ))
+    return out
+
+
+def ols_fits(aggs, x, y):
+    """Closed-form least-squares fits ``y = intercept + slope * x``.
+
+    ``aggs`` maps a group name to its Aggregates; all groups are solved at
+    once from their sufficient statistics (rows where both x and y are
+    present), so no rows are touched and statsmodels is not needed.
+    Returns one row per group: n, slope, intercept, r2, x_min, x_max.
+    """
+    names = list(aggs)
+    if not names:
+        return pd.DataFrame(columns=["n", "slope", "intercept", "r2", "x_min", "x_max"])
+    columns = aggs[names[0]].columns
+    i, j = columns.index(x), columns.index(y)
+
+    def stack(attr, a, b):
+        return np.array([getattr(aggs[g], attr)[a, b] for g in names])
+
+    n, sxy = stack("pair_n", i, j), stack("cross", i, j)
+    sx, sxx = stack("pair_sum", i, j), stack("pair_sumsq", i, j)
+    sy, syy = stack("pair_sum", j, i), stack("pair_sumsq", j, i)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sxx_c = n * sxx - sx ** 2
+        syy_c = n * syy - sy ** 2
+        sxy_c = n * sxy - sx * sy
+        slope = np.where(sxx_c > 0, sxy_c / sxx_c, np.nan)
+        intercept = (sy - slope * sx) / n
+        r2 = np.where((sxx_c > 0) & (syy_c > 0), sxy_c ** 2 / (sxx_c * syy_c), np.nan)
+    x_min = np.array([aggs[g].minimum[i] for g in names])
+    x_max = np.array([aggs[g].maximum[i] for g in names])
+    return pd.DataFrame({
+        "n": n.astype("int64"), "slope": slope, "intercept": intercept, "r2": r2,
+        "x_min": np.where(np.isfinite(x_min), x_min, np.nan),
+        "x_max": np.where(np.isfinite(x_max), x_max, np.nan),
+    }, index=names)
+
+
+@dataclass
+class SegmentStats:
+    """Everything the dashboard charts need for one filter state."""
+    n: int
+    means: pd.Series             # per column
+    counts: pd.Series            # non-missing answers per column
+    corr: pd.DataFrame           # Pearson, all columns
+    value_counts: dict           # column -> counts per observed value (sorted)
+    fakultas_means: pd.DataFrame  # "Fakultas" + one mean column per factor
+    fakultas_counts: pd.Series   # respondents per Fakultas, descending
+
+
+@dataclass
+class SegmentComparison:
+    """Several segments side by side, one column (or key) per segment."""
+    n: pd.Series                # respondents per segment
+    means: pd.DataFrame         # column x segment
+    distribution: pd.DataFrame  # satisfaction score x segment, share of answers
+    rankings: dict              # segment -> factor_ranking of its factor means
+
+
+class AggregateCube:
+    """Aggregates for every (Fakultas, Prodi) filter state of one dataset.
+
+    Keys are ``(fakultas, prodi)`` with ``ALL`` standing for "Semua". Only
+    combinations that select at least one row are stored; ``get`` returns
+    None for the others, which the dashboard treats as an empty filter.
+    """
+
+    def __init__(self, df, columns, levels=None):
+        self.columns = [c for c in columns if c in df.columns]
+        self.group_columns = [c for c in GROUP_COLUMNS if c in df.columns]
+        if levels is None:
+            self.levels = compute_levels(df, self.columns)
+        else:
+            self.levels = {c: v for c, v in levels.items() if c in self.columns}
+
+        self.segments = {}
+        self._stats = {}
+        self._fits = {}
+        self._fits_lock = threading.Lock()
+        cell_keys, cell_ids = self._cells(df)
+        cells = grouped_aggregates(df, self.columns, self.levels, cell_ids, len(cell_keys))
+        for (fak, prodi), cell in zip(cell_keys, cells):
+            for seg in self._rollups(fak, prodi):
+                self.segments[seg] = self.segments[seg] + cell if seg in self.segments else cell
+
+        self.fakultas = sorted({f for f, _ in self.segments if f != ALL})
+
+    def _cells(self, df):
+        """(list of (fakultas, prodi) cell keys, cell id per row)."""
+        combined = np.zeros(len(df), dtype="int64")
+        uniques = {}
+        for col in GROUP_COLUMNS:
+            if col in self.group_columns:
+                codes, uniques[col] = pd.factorize(df[col], use_na_sentinel=False)
+                combined = combined * len(uniques[col]) + codes
+            else:
+                uniques[col] = [ALL]
+        present, cell_ids = np.unique(combined, return_inverse=True)
+        n_prodi = len(uniques["Prodi"])
+        keys = [(uniques["Fakultas"][c // n_prodi], uniques["Prodi"][c % n_prodi]) for c in present]
+        return keys, cell_ids
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_fits_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._fits_lock = threading.Lock()
+
+    @classmethod
+    def combine(cls, cubes):
+        """Merge cubes built over disjoint Fakultas partitions with the same columns and levels.
+
+        Memoized SegmentStats of faculty-specific segments are kept; the
+        "Semua" roll-ups span partitions and are recomputed on demand.
+        """
+        new = copy.copy(cubes[0])
+        new.segments, new._stats, new._fits = {}, {}, {}
+        new._fits_lock = threading.Lock()
+        for cube in cubes:
+            for key, agg in cube.segments.items():
+                new.segments[key] = new.segments[key] + agg if key in new.segments else agg
+            new._stats.update({k: v for k, v in cube._stats.items() if k[0] != ALL})
+        new.fakultas = sorted({f for f, _ in new.segments if f != ALL})
+        return new
+
+    @classmethod
+    def from_chunks(cls, chunks, columns):
+        """Build a cube from an iterable of frames, one chunk in memory at a time."""
+        cube = None
+        for chunk in chunks:
+            cube = cls(chunk, columns) if cube is None else cube.appended(chunk)
+        return cube
+
+    def appended(self, batch):
+        """A new cube that also covers the rows of ``batch``.
+
+        Only the batch is scanned: its cell aggregates are added onto the
+        existing segments, whose sufficient statistics are additive. Value
+        levels not seen before are merged into the histograms.
+        """
+        new = copy.copy(self)
+        new._stats = {}
+        new._fits = {}
+        new._fits_lock = threading.Lock()
+        new.levels = dict(self.levels)
+        segments = dict(self.segments)
+        for col in list(new.levels):
+            seen = np.unique(batch[col].dropna().to_numpy())
+            merged = np.union1d(new.levels[col], seen)
+            if len(merged) == len(new.levels[col]):
+                continue
+            if len(merged) > MAX_HIST_LEVELS:
+                del new.levels[col]
+                segments = {k: replace(a, hist={c: h for c, h in a.hist.items() if c != col})
+                            for k, a in segments.items()}
+                continue
+            positions = np.searchsorted(merged, new.levels[col])
+            new.levels[col] = merged
+            for k, a in segments.items():
+                hist = np.zeros(len(merged), dtype=a.hist[col].dtype)
+                hist[positions] = a.hist[col]
+                segments[k] = replace(a, hist={**a.hist, col: hist})
+
+        cell_keys, cell_ids = new._cells(batch)
+        cells = grouped_aggregates(batch, new.columns, new.levels, cell_ids, len(cell_keys))
+        for (fak, prodi), cell in zip(cell_keys, cells):
+            for seg in self._rollups(fak, prodi):
+                segments[seg] = segments[seg] + cell if seg in segments else cell
+        new.segments = segments
+        new.fakultas = sorted({f for f, _ in segments if f != ALL})
+        return new
+
+    @staticmethod
+    def _rollups(fak, prodi):
+        fak = ALL if pd.isna(fak) else fak
+        prodi = ALL if pd.isna(prodi) else prodi
+        return {(ALL, ALL), (fak, ALL), (ALL, prodi), (fak, prodi)}
+
+    def get(self, fakultas=ALL, prodi=ALL):
+        return self.segments.get((fakultas, prodi))
+
+    def stats(self, fakultas=ALL, prodi=ALL):
+        """SegmentStats for a filter state (memoized), None if it selects no rows.
+
+        The unfiltered state always exists: for an empty dataset it has n=0
+        and NaN means, like a mean over no rows.
+        """
+        key = (fakultas, prodi)
+        if key not in self._stats:
+            agg = self.get(*key)
+            if agg is None and key == (ALL, ALL):
+                agg = grouped_aggregates(pd.DataFrame(columns=self.columns), self.columns, self.levels)[0]
+            if agg is None:
+                return None
+            self._stats[key] = SegmentStats(
+                n=agg.n,
+                means=agg.means(),
+                counts=agg.count,
+                corr=agg.corr(),
+                value_counts={c: agg.value_counts(c, self.levels[c]) for c in agg.hist},
+                fakultas_means=self.fakultas_means(self.columns, *key),
+                fakultas_counts=self.fakultas_counts(*key),
+            )
+        return self._stats[key]
+
+    def trendlines(self, x, y, fakultas=ALL, prodi=ALL):
+        """Per-Fakultas OLS fits of y on x for a filter state (memoized)."""
+        key = (x, y, fakultas, prodi)
+        with self._fits_lock:
+            if key in self._fits:
+                return self._fits[key]
+        fits = ols_fits(self.by_fakultas(fakultas, prodi), x, y)
+        with self._fits_lock:
+            self._fits[key] = fits
+        return fits
+
+    def clear(self):
+        """Drop the memoized stats and trendlines (the aggregates are kept)."""
+        with self._fits_lock:
+            self._fits.clear()
+        self._stats.clear()
+
+    def precompute_trendlines(self, xs, y, fakultas=ALL, prodi=ALL, background=True):
+        """Fill the trendline memo for every column in ``xs``.
+
+        With ``background`` the work runs on a daemon thread so the current
+        rerun does not wait for it.
+        """
+        def run():
+            for x in xs:
+                self.trendlines(x, y, fakultas, prodi)
+        if not background:
+            return run()
+        threading.Thread(target=run, name="precompute-trendlines", daemon=True).start()
+
+    def by_fakultas(self, fakultas=ALL, prodi=ALL):
+        """Per-Fakultas aggregates of the rows selected by the filter."""
+        names = self.fakultas if fakultas == ALL else [fakultas]
+        return {f: self.segments[(f, prodi)] for f in names if (f, prodi) in self.segments}
+
+    def fakultas_means(self, columns, fakultas=ALL, prodi=ALL):
+        """Like ``df_filtered.groupby("Fakultas")[columns].mean().reset_index()``."""
+        parts = self.by_fakultas(fakultas, prodi)
+        rows = [agg.means(columns) for agg in parts.values()]
+        out = pd.DataFrame(rows, columns=list(columns))
+        out.insert(0, "Fakultas", pd.Series(list(parts), dtype=object))
+        return out
+
+    def fakultas_counts(self, fakultas=ALL, prodi=ALL):
+        """Like ``df_filtered["Fakultas"].value_counts()``."""
+        parts = self.by_fakultas(fakultas, prodi)
+        return pd.Series({f: agg.n for f, agg in parts.items()}, dtype="int64").sort_values(ascending=False)
+
+    def segment_names(self, dimension, fakultas=ALL):
+        """Comparable segments: every Fakultas, or every Prodi within ``fakultas``."""
+        if dimension == "Fakultas":
+            return list(self.fakultas)
+        return sorted(p for f, p in self.segments if f == fakultas and p != ALL)
+
+    def compare(self, dimension, names, factors, fakultas=ALL):
+        """SegmentComparison of Fakultas (or Prodi within ``fakultas``) ``names``.
+
+        Every segment was aggregated in the cube's single grouped pass, so
+        this only reads their sufficient statistics.
+        """
+        keys = {name: (name, ALL) if dimension == "Fakultas" else (fakultas, name) for name in names}
+        aggs = {name: self.segments[key] for name, key in keys.items() if key in self.segments}
+        means = pd.DataFrame({name: agg.means(list(factors) + [TARGET]) for name, agg in aggs.items()})
+        distribution = {}
+        if TARGET in self.levels:
+            for name, agg in aggs.items():
+                counts = pd.Series(agg.hist[TARGET], index=self.levels[TARGET], dtype="float64")
+                distribution[name] = counts / counts.sum() if counts.sum() else counts
+        return SegmentComparison(
+            n=pd.Series({name: agg.n for name, agg in aggs.items()}, dtype="int64"),
+            means=means,
+            distribution=pd.DataFrame(distribution),
+            rankings={name: factor_ranking(means.loc[list(factors), name]) for name in aggs},
+        )
+
+
+# ===============================
+# Process-wide cube registry
+# ===============================
+_cubes = OrderedDict()
+_cubes_lock = threading.Lock()
+MAX_CUBES = 4
+# One lock per registry entry being built; dropped once nobody holds it
+_building = weakref.WeakValueDictionary()
+_building_lock = threading.Lock()
+
+
+def _build_lock(key):
+    """Lock serializing builds of one registry entry: late callers wait, then find it."""
+    with _building_lock:
+        return _building.setdefault(key, threading.Lock())
+
+
+def _registered_cube(key):
+    with _cubes_lock:
+        if key in _cubes:
+            _cubes.move_to_end(key)
+            return _cubes[key]
+    return None
+
+
+def get_cube(version, df, columns, snapshot=None):
+    """The cube for a dataset version, shared by all sessions.
+
+    On first use it is read from ``snapshot`` when that file was written for
+    this exact version and columns, otherwise built from ``df``. ``df`` may
+    be a callable returning the frame, so it is only assembled on a miss.
+    Concurrent first uses build it once.
+    """
+    key = (version, tuple(columns))
+    cube = _registered_cube(key)
+    if cube is not None:
+        return cube
+    with _build_lock(("cube",) + key):
+        cube = _registered_cube(key)
+        if cube is None:
+            cube = read_snapshot(snapshot, version, columns) if snapshot else None
+            if cube is None:
+                cube = AggregateCube(df() if callable(df) else df, columns)
+            put_cube(version, columns, cube)
+    return cube
+
+
+def put_cube(version, columns, cube):
+    """Register a cube (e.g. one extended by ``appended``) for a dataset version."""
+    with _cubes_lock:
+        _cubes[(version, tuple(columns))] = cube
+        _cubes.move_to_end((version, tuple(columns)))
+        while len(_cubes) > MAX_CUBES:
+            _cubes.popitem(last=False)
+
+
+# ===============================
+# Drill-down filters (bitmap index)
+# ===============================
+# Dimensions with one bitmap per distinct value
+INDEX_COLUMNS = GROUP_COLUMNS + ["Pilihan_Twin_Tower", "Kesediaan_Isi_Survei", "Sarana_Prasarana_Stres"] + CANDIDATE_FACTORS + [TARGET]
+# Numeric dimensions indexed by bucket instead: column -> (edges, labels), buckets are [low, high)
+BUCKETS = {
+    "Jam_Minggu_Akademik": ([0, 2, 4, 8, np.inf], ["< 2 jam", "2–4 jam", "4–8 jam", "≥ 8 jam"]),
+}
+
+
+class BitmapIndex:
+    """Packed row bitmaps per value of every filter dimension of one dataset.
+
+    A selection maps columns to the accepted values; it resolves with a
+    bitwise OR within a column and AND across columns, on n/8 bytes per
+    bitmap, and never touches the frame itself.
+    """
+
+    def __init__(self, df):
+        self.n = len(df)
+        self.bitmaps = {}
+        for col in INDEX_COLUMNS + list(BUCKETS):
+            if col not in df.columns:
+                continue
+            if col in BUCKETS:
+                edges, labels = BUCKETS[col]
+                values = pd.cut(df[col], edges, right=False, labels=labels)
+            else:
+                values = df[col]
+            codes, uniques = pd.factorize(values, sort=True)
+            self.bitmaps[col] = {
+                value.item() if hasattr(value, "item") else value: np.packbits(codes == code)
+                for code, value in enumerate(uniques)
+            }
+
+    def values(self, column):
+        """Indexed values of ``column`` (sorted; bucket labels in bucket order)."""
+        if column in BUCKETS:
+            return [v for v in BUCKETS[column][1] if v in self.bitmaps.get(column, {})]
+        return list(self.bitmaps.get(column, {}))
+
+    def mask(self, selection):
+        """Packed bitmap of the rows matching ``selection`` (None when it is empty)."""
+        result = None
+        for col, values in selection.items():
+            bits = np.zeros((self.n + 7) // 8, dtype=np.uint8)
+            for value in values:
+                if value in self.bitmaps[col]:
+                    np.bitwise_or(bits, self.bitmaps[col][value], out=bits)
+            result = bits if result is None else np.bitwise_and(result, bits, out=result)
+        return result
+
+    def rows(self, selection):
+        """Positions of the rows matching ``selection`` (all rows when it is empty)."""
+        bits = self.mask(selection)
+        if bits is None:
+            return np.arange(self.n)
+        return np.flatnonzero(np.unpackbits(bits, count=self.n))
+
+
+def freeze_selection(selection):
+    """Hashable form of a selection, for cache keys."""
+    return tuple(sorted((col, tuple(values)) for col, values in selection.items()))
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+MAX_INDEXES = 2
+
+
+def _lru_get(registry, lock, key):
+    with lock:
+        if key in registry:
+            registry.move_to_end(key)
+            return registry[key]
+    return None
+
+
+def _lru_put(registry, lock, key, value, limit):
+    with lock:
+        registry[key] = value
+        while len(registry) > limit:
+            registry.popitem(last=False)
+
+
+def get_index(version, df):
+    """The BitmapIndex of a dataset version, built once on first use and shared by all sessions."""
+    index = _lru_get(_indexes, _indexes_lock, version)
+    if index is None:
+        with _build_lock(("index", version)):
+            index = _lru_get(_indexes, _indexes_lock, version)
+            if index is None:
+                index = BitmapIndex(df)
+                _lru_put(_indexes, _indexes_lock, version, index, MAX_INDEXES)
+    return index
+
+
+_drill_cubes = OrderedDict()
+_drill_cubes_lock = threading.Lock()
+MAX_DRILL_CUBES = 8
+
+
+def get_drill_cube(version, selection, df, columns):
+    """The cube of the rows of a dataset version matching a drill-down ``selection``.
+
+    Drill cubes have their own LRU, so sessions exploring many selections
+    never evict the dataset cubes in ``get_cube``. ``df`` may be a callable.
+    """
+    key = (version, freeze_selection(selection), tuple(columns))
+    cube = _lru_get(_drill_cubes, _drill_cubes_lock, key)
+    if cube is None:
+        with _build_lock(("drill",) + key):
+            cube = _lru_get(_drill_cubes, _drill_cubes_lock, key)
+            if cube is None:
+                cube = AggregateCube(df() if callable(df) else df, columns)
+                _lru_put(_drill_cubes, _drill_cubes_lock, key, cube, MAX_DRILL_CUBES)
+    return cube
+
+
+# ===============================
+# Parallel precompute + snapshots
+# ===============================
+SNAPSHOT_SUFFIX = ".snapshot.pkl.gz"
+
+
+def snapshot_path(data_path):
+    return os.path.splitext(data_path)[0] + SNAPSHOT_SUFFIX
+
+
+def _build_partition(args):
+    df, columns, levels = args
+    cube = AggregateCube(df, columns, levels)
+    for key in cube.segments:
+        if key[0] != ALL:
+            cube.stats(*key)
+    return cube
+
+
+def build_cube_parallel(df, columns, workers=None):
+    """Build the cube with one process per Fakultas partition, then merge.
+
+    Workers also precompute SegmentStats for their faculty's filter states;
+    the "Semua" roll-ups are finished in the parent. Every filter state is
+    memoized in the returned cube.
+    """
+    from concurrent.futures import ProcessPoolExecutor  # only needed by the batch CLI
+
+    columns = [c for c in columns if c in df.columns]
+    levels = compute_levels(df, columns)
+    parts = [part for _, part in df.groupby("Fakultas", observed=True, dropna=False, sort=False)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        cubes = list(pool.map(_build_partition, [(part, columns, levels) for part in parts]))
+    cube = AggregateCube.combine(cubes)
+    for key in cube.segments:
+        cube.stats(*key)
+    return cube
+
+
+def write_snapshot(path, version, columns, cube):
+    with gzip.open(path, "wb") as f:
+        pickle.dump({"version": version, "columns": list(columns), "cube": cube}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    logger.info("wrote snapshot %s (%d segments)", path, len(cube.segments))
+
+
+def read_snapshot(path, version, columns):
+    """Cube from a snapshot written by precompute.py; None if absent or stale.
+
+    Snapshots are pickles: only load files produced by your own precompute job.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with gzip.open(path, "rb") as f:
+            snap = pickle.load(f)
+    except Exception as e:
+        logger.warning("ignoring unreadable snapshot %s: %s", path, e)
+        return None
+    if snap.get("version") != version or snap.get("columns") != list(columns):
+        logger.info("ignoring snapshot %s: built for another dataset version", path)
+        return None
+    return snap["cube"]
+
+
+# ===============================
+# Bootstrap confidence intervals
+# ===============================
+BOOTSTRAP_REPLICATES = 1000
+# Replicates are drawn in fixed-size tasks with their own seeds, so a result
+# does not depend on whether (or on how many processes) it was computed
+BOOTSTRAP_TASKS = 8
+# Upper bound on replicate x row cells drawn at once (memory of one batch)
+BOOTSTRAP_BATCH_CELLS = 2_000_000
+# Segments with at least this many rows are resampled in the process pool
+BOOTSTRAP_POOL_ROWS = 100_000
+
+
+@dataclass
+class BootstrapCI:
+    """Percentile bootstrap intervals of the means of one filter state."""
+    level: float
+    replicates: int
+    overall: pd.DataFrame      # column -> mean, low, high
+    by_fakultas: pd.DataFrame  # Fakultas -> n, mean, low, high of the target
+
+
+def _resample_means(values, replicates, seed, bounds=None):
+    """Column means of ``replicates`` row resamples of ``values`` (NaN-aware).
+
+    With ``bounds`` (row offsets of consecutive, non-empty strata) every
+    replicate resamples each stratum within its own rows, and the result is
+    (replicates x strata x columns) means per stratum.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(values)
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    present = present.astype(float)
+    if bounds is None:
+        out = np.empty((replicates, values.shape[1]))
+    else:
+        sizes = np.diff(bounds)
+        low = np.repeat(bounds[:-1], sizes).astype(np.int64)
+        span = np.repeat(sizes, sizes).astype(np.int64)
+        columns = [(np.ascontiguousarray(filled[:, j]), np.ascontiguousarray(present[:, j])) for j in range(values.shape[1])]
+        out = np.empty((replicates, len(sizes), values.shape[1]))
+    batch = max(1, BOOTSTRAP_BATCH_CELLS // n)
+    for start in range(0, replicates, batch):
+        b = min(batch, replicates - start)
+        if bounds is None:
+            # One row of indices per replicate, turned into draw counts per row;
+            # the resampled sums are then a single matrix product
+            idx = rng.integers(0, n, size=(b, n)) + (np.arange(b) * n)[:, None]
+            weights = np.bincount(idx.ravel(), minlength=b * n).reshape(b, n).astype(float)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[start:start + b] = (weights @ filled) / (weights @ present)
+            continue
+        # 32 random bits per draw, mapped onto the row's stratum by multiply-shift
+        idx = rng.integers(0, 1 << 32, size=(b, n), dtype=np.int64)
+        idx *= span
+        idx >>= 32
+        idx += low
+        for j, (col, col_present) in enumerate(columns):
+            sums = np.add.reduceat(np.take(col, idx), bounds[:-1], axis=1)
+            # Without missing answers every draw counts
+            counts = sizes if col_present.all() else np.add.reduceat(np.take(col_present, idx), bounds[:-1], axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[start:start + b, :, j] = sums / counts
+    return out
+
+
+def _bootstrap_task(args):
+    """Pool task: resample the matrix published in shared memory by ``bootstrap_means``.
+
+    Tasks only carry the block's name, so the rows are copied once per
+    segment rather than pickled into every task.
+    """
+    from multiprocessing import shared_memory
+
+    name, shape, replicates, seed, bounds = args
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        values = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+        out = _resample_means(values, replicates, seed, bounds)
+        del values  # release the buffer before closing the block
+        return out
+    finally:
+        block.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _bootstrap_pool():
+    """Process pool shared by every session; spawned workers (the server is threaded)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            _pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def bootstrap_means(values, replicates=BOOTSTRAP_REPLICATES, seed=0, parallel=None, bounds=None):
+    """(replicates x columns) means of row resamples of a 2-D float array.
+
+    ``bounds`` resamples within strata (see ``_resample_means``).
+    ``parallel`` defaults to using the process pool for segments of at least
+    BOOTSTRAP_POOL_ROWS rows; the draws are the same either way.
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return np.full((replicates, values.shape[1]), np.nan)
+    sizes = [len(part) for part in np.array_split(np.arange(replicates), min(BOOTSTRAP_TASKS, replicates))]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if parallel is None:
+        parallel = len(values) >= BOOTSTRAP_POOL_ROWS and (os.cpu_count() or 1) > 1
+    if parallel:
+        from concurrent.futures.process import BrokenProcessPool
+        from multiprocessing import shared_memory
+
+        global _pool
+        block = shared_memory.SharedMemory(create=True, size=values.nbytes)
+        try:
+            shared = np.ndarray(values.shape, dtype=np.float64, buffer=block.buf)
+            shared[:] = values
+            del shared
+            tasks = [(block.name, values.shape, size, s, bounds) for size, s in zip(sizes, seeds)]
+            return np.vstack(list(_bootstrap_pool().map(_bootstrap_task, tasks)))
+        except BrokenProcessPool as e:
+            logger.warning("bootstrap pool failed, resampling in-process: %s", e)
+            with _pool_lock:
+                _pool = None
+        finally:
+            block.close()
+            block.unlink()
+    return np.vstack([_resample_means(values, size, s, bounds) for size, s in zip(sizes, seeds)])
+
+
+def _percentiles(draws, level):
+    """(low, high) percentile bounds over the replicates (first axis)."""
+    tail = (1 - level) / 2 * 100
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # columns without answers stay NaN
+        return np.nanpercentile(draws, [tail, 100 - tail], axis=0)
+
+
+def bootstrap_intervals(df, columns, replicates=BOOTSTRAP_REPLICATES, level=0.95, seed=0):
+    """Bootstrap CIs of the column means of ``df`` and of the target per Fakultas.
+
+    ``df`` holds the rows of one filter state; each Fakultas is resampled
+    within its own rows, so small faculties get honestly wide intervals.
+    All faculties are resampled in the same draws, stratified by Fakultas.
+    """
+    columns = [c for c in columns if c in df.columns]
+    values = df[columns].astype(float)
+    low, high = _percentiles(bootstrap_means(values.to_numpy(), replicates, seed), level)
+    overall = pd.DataFrame({"mean": values.mean().to_numpy(), "low": low, "high": high}, index=columns)
+
+    by_fakultas = pd.DataFrame(columns=["Fakultas", "n", "mean", "low", "high"])
+    if "Fakultas" in df.columns and TARGET in df.columns:
+        codes, names = pd.factorize(df["Fakultas"], sort=True)
+        rows = codes >= 0
+        codes, target = codes[rows], df[TARGET].to_numpy(dtype=float)[rows]
+        order = np.argsort(codes, kind="stable")
+        codes, target = codes[order], target[order]
+        if len(names):
+            bounds = np.searchsorted(codes, np.arange(len(names) + 1))
+            draws = bootstrap_means(target[:, None], replicates, seed, bounds=bounds)[:, :, 0]
+            low, high = _percentiles(draws, level)
+            groups = pd.Series(target).groupby(codes)
+            by_fakultas = pd.DataFrame({
+                "Fakultas": list(names), "n": groups.count().to_numpy(),
+                "mean": groups.mean().to_numpy(), "low": low, "high": high,
+            })
+    return BootstrapCI(level, replicates, overall, by_fakultas)